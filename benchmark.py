@@ -0,0 +1,1213 @@
+"""Benchmarks for the streak tracker hot paths.
+
+Run ``python benchmark.py`` for every benchmark or name the ones to run,
+e.g. ``python benchmark.py engine``.
+
+``paths`` drives the real ``StreakTrackerApp`` headlessly, with Tk stubs and
+an Agg canvas, over synthetic databases. Timings are recorded as metrics:
+``--json results.json`` saves them, and a later run with ``--baseline
+results.json`` fails if any metric got slower by more than ``--threshold``.
+``--profile`` prints the hottest functions under cProfile.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+import streak_store
+from streak_engine import compute_batch, compute_streaks, to_ordinals
+
+
+def timed(func, *args, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+RESULTS = {}  # Metric name -> seconds, for --json and --baseline
+
+
+def record(name, seconds):
+    RESULTS[name] = seconds
+    return seconds
+
+
+def synthetic_ordinals(count, gap_probability=0.05, seed=0):
+    # Mostly consecutive days with the occasional 2-6 day gap.
+    rng = np.random.default_rng(seed)
+    steps = np.ones(count, dtype=np.int64)
+    gaps = rng.random(count) < gap_probability
+    steps[gaps] += rng.integers(1, 6, size=int(gaps.sum()))
+    steps[0] = 0
+    return date(1900, 1, 1).toordinal() + np.cumsum(steps)
+
+
+def legacy_streak_loop(dates):
+    # The per-date loop that used to live inline in plot_streak.
+    streak_lengths = []
+    max_streak = 0
+    current_streak = 0
+    previous_date = None
+    breaks_dates = []
+    for d in dates:
+        if previous_date and (d - previous_date).days == 1:
+            current_streak += 1
+        else:
+            if previous_date is not None:
+                breaks_dates.append(d)
+            current_streak = 1
+        streak_lengths.append(current_streak)
+        if current_streak > max_streak:
+            max_streak = current_streak
+        previous_date = d
+    return streak_lengths, max_streak, breaks_dates
+
+
+def synthetic_batch(count, module_size=1_000_000):
+    # Larger totals are split across modules: a single history cannot
+    # exceed the ~2.9M days representable by datetime.date.
+    ordinals = []
+    module_ids = []
+    for module_id, start in enumerate(range(0, count, module_size), start=1):
+        size = min(module_size, count - start)
+        ordinals.append(synthetic_ordinals(size, seed=module_id))
+        module_ids.append(np.full(size, module_id, dtype=np.int64))
+    return np.concatenate(ordinals), np.concatenate(module_ids)
+
+
+def bench_engine(sizes):
+    print(f"{'dates':>10} {'modules':>8} {'loop (s)':>10} {'engine (s)':>11} {'+to_ordinals':>13} {'speedup':>8}")
+    for size in sizes:
+        ordinals, module_ids = synthetic_batch(size)
+        boundaries = np.flatnonzero(np.diff(module_ids)) + 1
+        modules = [[date.fromordinal(int(o)) for o in chunk] for chunk in np.split(ordinals, boundaries)]
+
+        loop_time = timed(lambda: [legacy_streak_loop(dates) for dates in modules])
+        engine_time = record(f"engine.{size}", timed(compute_batch, ordinals, module_ids, repeat=3))
+        full_time = timed(lambda: compute_batch(np.concatenate([to_ordinals(dates) for dates in modules]), module_ids))
+
+        expected = legacy_streak_loop(modules[0][:10000])
+        result = compute_streaks(ordinals[:10000])
+        assert list(result.lengths) == expected[0] and result.max_streak == expected[1]
+
+        print(f"{size:>10} {len(modules):>8} {loop_time:>10.4f} {engine_time:>11.4f} {full_time:>13.4f} "
+              f"{loop_time / engine_time:>7.0f}x")
+
+
+def temp_database(path, connect=sqlite3.connect):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = connect(path)
+    streak_store.create_tables(conn)
+    return conn
+
+
+def legacy_add_date_range(conn, module_id, start_date, end_date):
+    # The day-by-day INSERT loop add_date_range used on the one-row-per-date table.
+    cursor = conn.cursor()
+    current_date = start_date
+    added_count = 0
+    while current_date <= end_date:
+        try:
+            cursor.execute("INSERT INTO streaks (date, module_id) VALUES (?, ?)",
+                           (current_date.strftime("%Y-%m-%d"), module_id))
+            added_count += 1
+        except sqlite3.IntegrityError:
+            pass
+        current_date += timedelta(days=1)
+    conn.commit()
+    return added_count
+
+
+def bench_ingest(years=10, modules=20):
+    start = date(2000, 1, 1)
+    end = start + timedelta(days=365 * years - 1)
+    # Each module gets the backfill twice (the second pass is all duplicates)
+    # plus a handful of overlapping short ranges.
+    batch = []
+    for module_id in range(1, modules + 1):
+        batch.append((module_id, start, end))
+        batch.append((module_id, start, end))
+        for offset in range(0, 365 * years, 400):
+            batch.append((module_id, start + timedelta(days=offset), start + timedelta(days=offset + 30)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ingest.db")
+
+        conn = temp_database(path)
+        streak_store._create_streaks_table(conn.cursor())
+        began = time.perf_counter()
+        legacy_added = sum(legacy_add_date_range(conn, *job) for job in batch)
+        legacy_time = time.perf_counter() - began
+        conn.close()
+
+        conn = temp_database(path)
+        began = time.perf_counter()
+        with conn:
+            added = streak_store.add_ranges(conn, batch)
+        bulk_time = record("ingest.add_ranges", time.perf_counter() - began)
+        runs = conn.execute("SELECT COUNT(*) FROM streak_runs").fetchone()[0]
+        conn.close()
+
+    assert added == legacy_added
+    print(f"{len(batch)} ranges over {modules} modules, {added} new days")
+    print(f"{'legacy per-day loop':>22}: {legacy_time:.4f}s")
+    print(f"{'add_ranges':>22}: {bulk_time:.4f}s ({runs} run rows, {legacy_time / bulk_time:.0f}x)")
+
+
+def check_query_plans(modules=200):
+    # Regression gate: the per-module reads must stay index-only (no table
+    # scan, no temp B-tree sort) however large the database grows.
+    conn = sqlite3.connect(":memory:")
+    streak_store.create_tables(conn)
+    conn.executemany("INSERT INTO modules (name) VALUES (?)", [(f"module {i}",) for i in range(modules)])
+    batch = []
+    notes = []
+    for module_id in range(1, modules + 1):
+        for offset in range(0, 3000, 7):
+            day = date(2000, 1, 1) + timedelta(days=offset)
+            batch.append((module_id, day, day + timedelta(days=4)))
+            notes.append((day.toordinal(), module_id, "note"))
+    with conn:
+        streak_store.add_ranges(conn, batch)
+    conn.executemany("INSERT INTO streak_notes (date, module_id, note) VALUES (?, ?, ?)", notes)
+    conn.execute("ANALYZE")
+
+    checks = [
+        (streak_store.RUNS_BY_MODULE_SQL, (1,)),
+        (streak_store.NOTES_BY_MODULE_SQL, (1,)),
+        (streak_store.RUNS_IN_SPAN_SQL, (1, date(2001, 1, 1).toordinal(), date(2000, 6, 1).toordinal())),
+    ]
+    failures = 0
+    for sql, params in checks:
+        plan = streak_store.query_plan(conn, sql, params)
+        lookups = [step for step in plan if step.startswith(("SCAN", "SEARCH"))]
+        ok = all("COVERING INDEX" in step for step in lookups) and not any("TEMP B-TREE" in step for step in plan)
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4}  {sql}\n      {'; '.join(plan)}")
+    conn.close()
+    if failures:
+        raise SystemExit(f"{failures} query plan(s) are no longer index-only")
+
+
+def check_stats_cache(modules=50, edits=20_000):
+    # Regression gate: after a random mix of every kind of write the trigger
+    # maintained module_stats must match the runs exactly.
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(":memory:")
+    streak_store.create_tables(conn)
+    for i in range(modules):
+        streak_store.add_module(conn, f"module {i}")
+    cursor = conn.cursor()
+    began = time.perf_counter()
+    for _ in range(edits):
+        module_id = int(rng.integers(1, modules + 1))
+        start = date(2000, 1, 1) + timedelta(days=int(rng.integers(0, 2000)))
+        end = start + timedelta(days=int(rng.choice([0, 0, 1, 3, 10, 60])))
+        if rng.random() < 0.6:
+            streak_store.add_range(cursor, module_id, start, end)
+        else:
+            streak_store.delete_range(cursor, module_id, start, end)
+    edit_time = record("stats.edits", time.perf_counter() - began)
+    streak_store.delete_module(conn, "module 0")
+    began = time.perf_counter()
+    mismatches = streak_store.check_stats(conn)
+    check_time = record("stats.check_stats", time.perf_counter() - began)
+    conn.close()
+    print(f"{edits} edits over {modules} modules in {edit_time:.3f}s, check_stats in {check_time:.4f}s")
+    for module_id, cached, actual in mismatches:
+        print(f"FAIL  module {module_id}: cached {cached}, actual {actual}")
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} module(s) have stale cached stats")
+
+
+def agg_axes():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    plt.style.use('ggplot')
+    figure = plt.Figure(figsize=(6, 4), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    return canvas, figure.add_subplot(111)
+
+
+def legacy_plot(ax, dates, streaks):
+    # What plot_streak did on every refresh: clear and rebuild every artist.
+    import matplotlib.dates as mdates
+
+    ax.clear()
+    ax.set_title("Streak Over Time", color="#2E4053", fontsize=14, fontweight='bold')
+    ax.set_xlabel("Date", color="#34495E", fontsize=12)
+    ax.set_ylabel("Streak Length (days)", color="#34495E", fontsize=12)
+    ax.spines['bottom'].set_color('#34495E')
+    ax.spines['left'].set_color('#34495E')
+    ax.tick_params(axis='x', colors='#34495E')
+    ax.tick_params(axis='y', colors='#34495E')
+    ax.grid(True, linestyle='--', alpha=0.5, color='#D5D8DC')
+    ax.plot(dates, streaks.lengths, marker='o', linestyle='-', color='#2980B9', markerfacecolor='#85C1E9',
+            markeredgecolor='#1B4F72', linewidth=2)
+    ax.set_ylim(0, streaks.max_streak + 1)
+    peaks = streaks.max_streak_indices
+    ax.scatter([dates[i] for i in peaks], streaks.lengths[peaks], color='#E74C3C', s=100, label='Highest Streak',
+               zorder=5, edgecolors='black')
+    breaks = [dates[i] for i in streaks.breaks]
+    if breaks:
+        ax.scatter(breaks, [0] * len(breaks), color='#F39C12', s=100, label='Streak Break', zorder=5,
+                   edgecolors='black', marker='X')
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.figure.autofmt_xdate()
+    ax.legend()
+    ax.annotate("", xy=(0, 0), xytext=(15, 15), textcoords="offset points", bbox=dict(boxstyle="round", fc="w"),
+                arrowprops=dict(arrowstyle="->")).set_visible(False)
+    ax.figure.canvas.draw()
+
+
+def bench_redraw(points):
+    from streak_plot import CalendarRenderer, StreakRenderer
+
+    print(f"{'points':>10} {'clear+rebuild (s)':>18} {'renderer (s)':>13} {'full draw (s)':>14} {'hover blit (s)':>15} "
+          f"{'calendar (s)':>13}")
+    for size in points:
+        ordinals = synthetic_ordinals(size)
+        streaks = compute_streaks(ordinals)
+        dates = [date.fromordinal(int(o)) for o in ordinals]
+
+        canvas, ax = agg_axes()
+        legacy_plot(ax, dates, streaks)
+        legacy_time = timed(legacy_plot, ax, dates, streaks, repeat=3)
+
+        canvas, ax = agg_axes()
+        renderer = StreakRenderer(canvas, ax)
+
+        # Agg has no event loop, so update()'s draw_idle draws immediately
+        renderer.update(streaks, {})
+        renderer_time = record(f"redraw.{size}.update", timed(renderer.update, streaks, {}, repeat=3))
+
+        hover = renderer.hover
+        hover.update_annot(size // 2)
+        hover.annot.set_visible(True)
+        blit_time = record(f"redraw.{size}.blit", timed(hover.blit, repeat=3))
+        draw_time = timed(canvas.draw, repeat=3)
+
+        # Same days as a calendar heatmap: one image whatever the number of days
+        canvas, ax = agg_axes()
+        ax.set_visible(False)
+        calendar = CalendarRenderer(canvas)
+        calendar_time = record(f"redraw.{size}.calendar", timed(calendar.update, streaks, {}, repeat=3))
+
+        print(f"{size:>10} {legacy_time:>18.4f} {renderer_time:>13.4f} {draw_time:>14.4f} {blit_time:>15.4f} "
+              f"{calendar_time:>13.4f}")
+
+
+def edit_database(path, connect):
+    # A fresh database with module 1 for edit_jobs to write to
+    conn = temp_database(path, connect)
+    streak_store.add_module(conn, "edits")
+    conn.commit()
+    return conn
+
+
+def edit_jobs(count):
+    # Alternately add and remove days so every job really writes.
+    for i in range(count):
+        day = date(2020, 1, 1) + timedelta(days=i // 2)
+        if i % 2:
+            yield streak_store.remove_dates, (1, day, day)
+        else:
+            yield streak_store.record_date, (1, day, "note" if i % 4 == 0 else None)
+
+
+def commit_per_edit(conn, count):
+    for func, args in edit_jobs(count):
+        func(conn, *args)
+        conn.commit()
+
+
+def concurrent_reads(path, connect, writer, seconds=1.0):
+    # Reader thread loads snapshots while the writer runs; returns (reads, worst latency).
+    import threading
+
+    stop = threading.Event()
+    stats = {"reads": 0, "worst": 0.0}
+
+    def reader():
+        conn = connect(path)
+        while not stop.is_set():
+            began = time.perf_counter()
+            streak_store.load_snapshot(conn, 1)
+            stats["worst"] = max(stats["worst"], time.perf_counter() - began)
+            stats["reads"] += 1
+        conn.close()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        writer()
+    stop.set()
+    thread.join()
+    return stats["reads"] / seconds, stats["worst"]
+
+
+def bench_connection(edits=500):
+    from streak_worker import DatabaseWorker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "connection.db")
+        print(f"{'profile':>28} {'edits/s':>9} {'reads/s while writing':>22} {'worst read (s)':>15}")
+        for label, connect in (("default sqlite3.connect", sqlite3.connect),
+                               ("streak_store.connect", streak_store.connect)):
+            conn = edit_database(path, connect)
+            edit_time = timed(commit_per_edit, conn, edits)
+            reads, worst = concurrent_reads(path, connect, lambda: commit_per_edit(conn, 20))
+            conn.close()
+            print(f"{label:>28} {edits / edit_time:>9.0f} {reads:>22.0f} {worst:>15.4f}")
+
+        edit_database(path, streak_store.connect).close()
+        worker = DatabaseWorker(lambda: streak_store.connect(path))
+
+        def burst():
+            futures = [worker.submit(func, *args) for func, args in edit_jobs(edits)]
+            for future in futures:
+                future.result()
+        burst_time = record("connection.worker_burst", timed(burst))
+        worker.close()
+        print(f"{'worker, grouped commits':>28} {edits / burst_time:>9.0f}")
+
+
+def bench_dashboard(module_counts):
+    # One load_summaries call against what clicking through every module costs.
+    rng = np.random.default_rng(0)
+    today = date(2010, 1, 1)
+    print(f"{'modules':>8} {'runs':>9} {'per-module loads (s)':>21} {'load_summaries (s)':>19}")
+    for modules in module_counts:
+        conn = sqlite3.connect(":memory:")
+        streak_store.create_tables(conn)
+        conn.executemany("INSERT INTO modules (name) VALUES (?)", [(f"module {i}",) for i in range(modules)])
+        batch = []
+        for module_id in range(1, modules + 1):
+            offset = 0
+            while offset < 3650:
+                day = today - timedelta(days=3650 - offset)
+                length = int(rng.integers(1, 15))
+                batch.append((module_id, day, day + timedelta(days=length - 1)))
+                offset += length + int(rng.integers(1, 10))
+        with conn:
+            streak_store.add_ranges(conn, batch)
+        runs = conn.execute("SELECT COUNT(*) FROM streak_runs").fetchone()[0]
+
+        def per_module():
+            for module_id in range(1, modules + 1):
+                snapshot = streak_store.load_snapshot(conn, module_id)
+                snapshot.streaks.current_streak(today)
+        loop_time = timed(per_module)
+        summary_time = record(f"dashboard.{modules}", timed(streak_store.load_summaries, conn, today, repeat=3))
+        conn.close()
+        print(f"{modules:>8} {runs:>9} {loop_time:>21.4f} {summary_time:>19.4f}")
+
+
+def bench_lifecycle(runs=200_000):
+    # Deleting a module with `runs` runs and as many notes: one statement per
+    # table against delete_module_chunk jobs, whose worst case is how long a
+    # module load can be kept waiting. Regression gate: nothing may be left
+    # behind and the freed pages must go back to the file system.
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lifecycle.db")
+        print(f"{'deletion':>10} {'total (s)':>10} {'worst job (s)':>14} {'file before (MB)':>17} {'after vacuum (MB)':>18}")
+        for label in ("one-shot", "chunked"):
+            conn = temp_database(path, streak_store.connect)
+            keep = streak_store.add_module(conn, "keep")
+            doomed = streak_store.add_module(conn, "doomed")
+            starts = np.arange(runs, dtype=np.int64) * 3 + date(1000, 1, 1).toordinal()
+            with conn:
+                for module_id in (keep, doomed):
+                    conn.executemany("INSERT INTO streak_runs (module_id, start_date, end_date) VALUES (?, ?, ?)",
+                                     zip([module_id] * runs, starts.tolist(), (starts + 1).tolist()))
+                    conn.executemany(streak_store.NOTE_UPSERT_SQL,
+                                     zip(starts.tolist(), [module_id] * runs, ["note"] * runs))
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            size_before = os.path.getsize(path)
+            began = time.perf_counter()
+            if label == "one-shot":
+                with conn:
+                    streak_store.delete_module(conn, "doomed")
+                worst = time.perf_counter() - began
+            else:
+                worst = 0.0
+                done = False
+                while not done:
+                    job_began = time.perf_counter()
+                    with conn:
+                        done = streak_store.delete_module_chunk(conn, doomed)
+                    worst = max(worst, time.perf_counter() - job_began)
+            total = record(f"lifecycle.{label}", time.perf_counter() - began)
+            if label == "chunked":
+                record("lifecycle.chunk", worst)
+            with conn:
+                while streak_store.vacuum_step(conn):
+                    pass
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            left = conn.execute("SELECT (SELECT COUNT(*) FROM streak_runs WHERE module_id = :m) + "
+                                "(SELECT COUNT(*) FROM streak_notes WHERE module_id = :m) + "
+                                "(SELECT COUNT(*) FROM module_stats WHERE module_id = :m)", {"m": doomed}).fetchone()[0]
+            dangling = conn.execute("PRAGMA foreign_key_check").fetchall()
+            stale = streak_store.check_stats(conn)
+            conn.close()
+            print(f"{label:>10} {total:>10.3f} {worst:>14.4f} {size_before / 1e6:>17.1f} "
+                  f"{os.path.getsize(path) / 1e6:>18.1f}")
+            if left or dangling or stale:
+                raise SystemExit(f"{label} deletion left {left} rows, {len(dangling)} dangling references "
+                                 f"and {len(stale)} stale stats behind")
+
+
+def bench_cli(lines=10_000):
+    # Process startup of a single CLI command, then one batch of `lines`
+    # single-day adds spread over ten modules, all in one transaction.
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cli.db")
+        cli = [sys.executable, os.path.join(here, "streak_cli.py"), "--db", path]
+        for i in range(10):
+            subprocess.run(cli + ["add-module", f"module {i}"], check=True)
+        startup = record("cli.command", timed(lambda: subprocess.run(cli + ["modules"], check=True, capture_output=True),
+                                              repeat=5))
+        start = date(2000, 1, 1)
+        batch = "".join(f'add "module {i % 10}" {(start + timedelta(days=i // 10)).isoformat()}\n' for i in range(lines))
+        began = time.perf_counter()
+        subprocess.run(cli + ["batch"], input=batch, text=True, check=True, capture_output=True)
+        batch_time = record("cli.batch", time.perf_counter() - began)
+    print(f"one command: {startup:.3f}s, batch of {lines} adds: {batch_time:.3f}s ({lines / batch_time:.0f} lines/s)")
+
+
+def bench_io(rows):
+    # Export and re-import about `rows` recorded days, one in ten with a note,
+    # through every streak_io format.
+    import streak_io
+
+    rng = np.random.default_rng(0)
+    modules = 20
+    conn = sqlite3.connect(":memory:")
+    streak_store.create_tables(conn)
+    conn.executemany("INSERT INTO modules (name) VALUES (?)", [(f"module {i}",) for i in range(modules)])
+    days = synthetic_ordinals(rows // modules)
+    spans = []
+    for module_id in range(1, modules + 1):
+        breaks = np.flatnonzero(np.diff(days) > 1)
+        starts = np.concatenate(([days[0]], days[breaks + 1]))
+        ends = np.concatenate((days[breaks], [days[-1]]))
+        spans.extend(zip([module_id] * starts.size, starts.tolist(), ends.tolist()))
+    with conn:
+        streak_store.add_spans(conn, spans)
+        noted = days[rng.random(days.size) < 0.1].tolist()
+        conn.executemany("INSERT INTO streak_notes (date, module_id, note) VALUES (?, ?, ?)",
+                         [(day, module_id, f"note {day}") for module_id in range(1, modules + 1) for day in noted])
+    print(f"{'format':>9} {'rows':>9} {'size (MB)':>10} {'export rows/s':>14} {'import rows/s':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in streak_io.FORMATS:
+            path = os.path.join(tmp, "export." + fmt)
+            began = time.perf_counter()
+            count = streak_io.export_file(conn, path, fmt)
+            export_time = record(f"io.{fmt}.export", time.perf_counter() - began)
+            target = sqlite3.connect(":memory:")
+            streak_store.create_tables(target)
+            began = time.perf_counter()
+            with target:
+                streak_io.import_file(target, path, fmt)
+            import_time = record(f"io.{fmt}.import", time.perf_counter() - began)
+            target.close()
+            print(f"{fmt:>9} {count:>9} {os.path.getsize(path) / 1e6:>10.1f} "
+                  f"{count / export_time:>14.0f} {count / import_time:>14.0f}")
+    conn.close()
+
+
+# Modules the GUI must not import before its window is on screen.
+DEFERRED_IMPORTS = ("matplotlib", "tkcalendar")
+FIRST_FRAME_BUDGET = 2.0  # seconds
+
+FIRST_FRAME_SCRIPT = """
+import sys, time
+began = time.perf_counter()
+import tkinter as tk
+import streak_tracker
+streak_tracker.DB_NAME = sys.argv[1]
+try:
+    root = tk.Tk()
+except tk.TclError as e:
+    print("skip", e)
+    sys.exit()
+app = streak_tracker.StreakTrackerApp(root)
+times = []
+
+def poll():
+    if not times and root.winfo_ismapped():
+        times.append(time.perf_counter() - began)
+    if times and app.renderer is not None and app.snapshot is not None:
+        root.update()
+        times.append(time.perf_counter() - began)
+        app.on_close()
+        return
+    root.after(1, poll)
+
+root.after(1, poll)
+root.mainloop()
+print(*times)
+"""
+
+
+def bench_startup():
+    # Import cost of the GUI module in a fresh interpreter, then the time
+    # until the controls are mapped and until the first plot is drawn.
+    check = f"import sys, streak_tracker; print(*[m for m in {DEFERRED_IMPORTS!r} if m in sys.modules])"
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", check],
+                            capture_output=True, text=True, check=True, cwd=here)
+    cumulative = next(int(line.split("|")[1]) for line in result.stderr.splitlines()
+                      if line.split("|")[-1].strip() == "streak_tracker")
+    leaked = result.stdout.split()
+    record("startup.import", cumulative / 1e6)
+    print(f"import streak_tracker: {cumulative / 1e6:.3f}s, deferred imports loaded: {', '.join(leaked) or 'none'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "startup.db")
+        conn = temp_database(path, streak_store.connect)
+        module_id = streak_store.add_module(conn, "startup")
+        start = date(2000, 1, 1)
+        ranges = [(module_id, start + timedelta(days=offset), start + timedelta(days=offset + 20))
+                  for offset in range(0, 3650, 25)]
+        with conn:
+            streak_store.add_ranges(conn, ranges)
+        conn.close()
+        result = subprocess.run([sys.executable, "-c", FIRST_FRAME_SCRIPT, path],
+                                capture_output=True, text=True, check=True, cwd=here)
+    frame = result.stdout.split()
+    if frame[0] == "skip":
+        print(f"first frame: skipped ({' '.join(frame[1:])})")
+        frame_time = 0.0
+    else:
+        controls_time, frame_time = map(float, frame)
+        record("startup.first_frame", frame_time)
+        print(f"controls mapped: {controls_time:.3f}s, first plot drawn: {frame_time:.3f}s")
+
+    if leaked:
+        raise SystemExit(f"importing streak_tracker eagerly loads {', '.join(leaked)}")
+    if frame_time > FIRST_FRAME_BUDGET:
+        raise SystemExit(f"first frame took {frame_time:.3f}s, budget is {FIRST_FRAME_BUDGET}s")
+
+
+# name -> (modules, years, mean run days, mean gap days, share of days with a note)
+PROFILES = {
+    "dense": (20, 80, 120, 2, 0.1),
+    "sparse": (500, 10, 2, 4, 0.02),
+}
+
+
+def synthetic_database(path, modules, years, run_days, gap_days, note_rate, seed=0):
+    """Write a streaks.db at ``path`` whose modules alternate geometric runs and gaps."""
+    rng = np.random.default_rng(seed)
+    first = date(2024, 12, 31).toordinal() - 365 * years
+    conn = temp_database(path, streak_store.connect)
+    conn.executemany("INSERT INTO modules (name) VALUES (?)", [(f"module {i}",) for i in range(modules)])
+    with conn:
+        for module_id in range(1, modules + 1):
+            count = 365 * years // (run_days + gap_days) + 1
+            lengths = rng.geometric(1 / run_days, count)
+            gaps = rng.geometric(1 / gap_days, count)
+            starts = first + np.concatenate(([0], np.cumsum(lengths + gaps)[:-1]))
+            ends = starts + lengths - 1
+            # Gaps are at least a day, so the runs can go in as they are
+            conn.executemany("INSERT INTO streak_runs (module_id, start_date, end_date) VALUES (?, ?, ?)",
+                             zip([module_id] * count, starts.tolist(), ends.tolist()))
+            days = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+            noted = days[rng.random(days.size) < note_rate].tolist()
+            conn.executemany(streak_store.NOTE_UPSERT_SQL, [(day, module_id, f"note {day}") for day in noted])
+    conn.close()
+
+
+class StubRoot:
+    # Just enough of tk.Tk for StreakTrackerApp: after() callbacks run on the
+    # first pump() once their delay has passed.
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, func, *args):
+        self.callbacks.append((time.perf_counter() + ms / 1000, func, args))
+        return len(self.callbacks)
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, token):
+        pass
+
+    def pump(self):
+        now = time.perf_counter()
+        due = [callback for callback in self.callbacks if callback[0] <= now]
+        self.callbacks = [callback for callback in self.callbacks if callback[0] > now]
+        for _, func, args in due:
+            func(*args)
+
+    def title(self, text):
+        pass
+
+    def protocol(self, name, func):
+        pass
+
+    def destroy(self):
+        pass
+
+
+class StubListbox:
+    def __init__(self):
+        self.items = []
+        self.selection = ()
+
+    def delete(self, first, last=None):
+        self.items = []
+
+    def insert(self, index, *items):
+        self.items.extend(items)
+
+    def get(self, first, last=None):
+        return self.items[first] if last is None else tuple(self.items)
+
+    def curselection(self):
+        return self.selection
+
+    def selection_set(self, index):
+        self.selection = (index,)
+
+    def selection_clear(self, first, last=None):
+        self.selection = ()
+
+    def see(self, index):
+        pass
+
+    def activate(self, index):
+        pass
+
+
+class StubLabel:
+    def config(self, **options):
+        self.options = options
+
+
+class StubVirtualList:
+    # Formats the rows a VirtualList of the same height would draw.
+
+    def __init__(self, rows=6):
+        self.rows = rows
+        self.text = []
+
+    def set_source(self, count, row_text, keep_position=False):
+        self.text = [row_text(i) for i in range(min(count, self.rows))]
+
+
+class StubVar:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class StubEntry:
+    def __init__(self):
+        self.text = ""
+
+    def get(self):
+        return self.text
+
+
+class StubMessagebox:
+    def __init__(self):
+        self.shown = []
+
+    def showinfo(self, title, message):
+        self.shown.append((title, message))
+
+    def showwarning(self, title, message):
+        self.shown.append((title, message))
+
+    def showerror(self, title, message):
+        raise AssertionError(f"{title}: {message}")
+
+    def askyesno(self, title, message):
+        return True
+
+
+def headless_app(path, tracer=None):
+    """A StreakTrackerApp on ``path`` with Tk stubs and an Agg plot."""
+    import streak_tracker
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from streak_plot import StreakRenderer
+
+    class IdleCanvas(FigureCanvasAgg):
+        # Agg draws on every draw_idle; Tk coalesces them into one draw when idle
+        def __init__(self, figure, root):
+            super().__init__(figure)
+            self.root = root
+            self.draw_pending = False
+
+        def draw_idle(self, *args, **kwargs):
+            if not self.draw_pending:
+                self.draw_pending = True
+                self.root.after_idle(self.idle_draw)
+
+        def idle_draw(self):
+            self.draw_pending = False
+            self.draw()
+
+    class HeadlessApp(streak_tracker.StreakTrackerApp):
+        def create_style(self):
+            self.style = None
+
+        def create_widgets(self):
+            self.module_listbox = StubListbox()
+            self.breaks_label = StubLabel()
+            self.highest_streak_label = StubLabel()
+            self.collapse_runs = StubVar(False)
+            self.dates_list = StubVirtualList()
+            for name in ("date_entry", "start_date_entry", "end_date_entry",
+                         "delete_start_date_entry", "delete_end_date_entry"):
+                setattr(self, name, StubEntry())
+            canvas, self.ax = agg_axes()
+            self.canvas = IdleCanvas(self.ax.figure, self.root)
+            if self.tracer is not None:
+                self.tracer.instrument(self.canvas, "draw")
+            self.renderer = StreakRenderer(self.canvas, self.ax)
+
+    streak_tracker.DB_NAME = path
+    app = HeadlessApp(StubRoot(), tracer)
+    # settle() pumps without pause, so finished jobs are handed over on the next pump
+    app.dispatcher.interval = 0
+    return app
+
+
+def settle(app, action, done, timeout=30.0):
+    # Run `action`, then the Tk loop until `done()` and the plot is redrawn;
+    # returns the elapsed time.
+    began = time.perf_counter()
+    action()
+    while not done() or app.canvas.draw_pending:
+        if time.perf_counter() - began > timeout:
+            raise RuntimeError("timed out waiting for the worker")
+        app.root.pump()
+        time.sleep(0)
+    return time.perf_counter() - began
+
+
+def bench_paths(profiles, repeat=5):
+    # The GUI hot paths end to end, worker thread and all, on synthetic databases.
+    import streak_tracker
+
+    print(f"{'profile':>8} {'path':>24} {'best (ms)':>10}")
+    messagebox = streak_tracker.messagebox
+    streak_tracker.messagebox = StubMessagebox()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile in profiles:
+                path = os.path.join(tmp, f"{profile}.db")
+                synthetic_database(path, *PROFILES[profile])
+                for name, seconds in time_paths(headless_app(path), streak_tracker.messagebox.shown, repeat):
+                    record(f"paths.{profile}.{name}", seconds)
+                    print(f"{profile:>8} {name:>24} {seconds * 1000:>10.4f}")
+    finally:
+        streak_tracker.messagebox = messagebox
+
+
+def time_paths(app, shown, repeat):
+    from streak_plot import DATENUM_OFFSET
+
+    settle(app, lambda: None, lambda: app.snapshot is not None)
+    modules = len(app.module_listbox.items)
+    timings = {}
+
+    def select(index):
+        app.module_listbox.selection_set(index)
+        app.on_module_select(None)
+
+    def selected(index):
+        module_id = app.module_ids[app.module_listbox.items[index]]
+        return lambda: app.snapshot is not None and app.snapshot.module_id == module_id
+
+    def cold_load(index):
+        app.snapshots.clear()
+        return settle(app, lambda: select(index), selected(index))
+    timings["load_data.cold"] = min(cold_load(i % modules) for i in range(1, repeat + 1))
+    # Once both modules are cached only the version check goes to the database
+    for index in (0, 1):
+        settle(app, lambda: select(index), selected(index))
+    timings["load_data.cached"] = min(
+        settle(app, lambda: select(i % 2), selected(i % 2)) for i in range(repeat * 2))
+
+    select(0)
+    settle(app, lambda: None, selected(0))
+    timings["plot_streak"] = min(settle(app, app.plot_streak, lambda: True) for _ in range(repeat))
+    calls = 10_000
+    timings["get_selected_module_id"] = timed(
+        lambda: [app.get_selected_module_id() for _ in range(calls)], repeat=repeat) / calls
+
+    last = app.snapshot.run_ends[-1]
+    start, end = date.fromordinal(last + 10), date.fromordinal(last + 40)
+    for entries in ((app.start_date_entry, app.end_date_entry),
+                    (app.delete_start_date_entry, app.delete_end_date_entry)):
+        entries[0].text, entries[1].text = start.isoformat(), end.isoformat()
+
+    def write(action):
+        count = len(shown)
+        return settle(app, action, lambda: len(shown) > count and app.snapshot is not None)
+    timings["add_date_range"] = min(write(app.add_date_range) for _ in range(repeat))
+    timings["delete_date_range"] = min(write(app.delete_date_range) for _ in range(repeat))
+
+    # Move the mouse from point to point along the line, so every event redraws the tooltip
+    app.canvas.draw()
+    hover = app.renderer.hover
+    points = np.linspace(0, hover.ordinals.size - 1, 100).astype(np.int64)
+    xdata = hover.ordinals[points] + DATENUM_OFFSET
+    pixels = app.ax.transData.transform(np.column_stack([xdata, hover.lengths[points]]))
+    events = [SimpleNamespace(inaxes=app.ax, x=x, y=y, xdata=datenum)
+              for datenum, (x, y) in zip(xdata.tolist(), pixels.tolist())]
+    timings["hover"] = timed(lambda: [hover.on_motion(event) for event in events], repeat=repeat) / len(events)
+    app.on_close()
+    return timings.items()
+
+
+SHARED_WRITER_SCRIPT = """
+import sys, time
+from datetime import date, timedelta
+import streak_store
+from streak_worker import DatabaseWorker
+
+path, module_id, edits, mode = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4]
+record_date, remove_dates = streak_store.record_date, streak_store.remove_dates
+retries = 4
+if mode == "deferred":
+    # The helpers without their writes mark, so each job reads before it asks for the write lock
+    record_date = lambda conn, *args: streak_store.record_date(conn, *args)
+    remove_dates = lambda conn, *args: streak_store.remove_dates(conn, *args)
+    retries = 0
+worker = DatabaseWorker(lambda: streak_store.connect(path), retries=retries)
+failed = 0
+began = time.perf_counter()
+for i in range(edits):
+    day = date(2020, 1, 1) + timedelta(days=i // 2)
+    future = worker.submit(remove_dates, module_id, day, day) if i % 2 else worker.submit(record_date, module_id, day)
+    try:
+        future.result()
+    except Exception:
+        failed += 1
+print(failed, time.perf_counter() - began)
+worker.close()
+"""
+
+
+def bench_shared(processes=4, edits=500):
+    # Several writer processes on one file, each committing one edit at a
+    # time: jobs that read before taking the write lock against the marked
+    # helpers. Then what an app pays to notice the other writers.
+    import streak_tracker
+    from streak_trace import Tracer
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'jobs':>9} {'processes':>10} {'edits/s':>9} {'failed edits':>13}")
+        failures = {}
+        for mode in ("deferred", "immediate"):
+            path = os.path.join(tmp, f"{mode}.db")
+            conn = streak_store.connect(path)
+            streak_store.create_tables(conn)
+            for i in range(processes):
+                streak_store.add_module(conn, f"module {i}")
+            conn.commit()
+            began = time.perf_counter()
+            writers = [subprocess.Popen([sys.executable, "-c", SHARED_WRITER_SCRIPT, path, str(i + 1), str(edits), mode],
+                                        stdout=subprocess.PIPE, text=True, cwd=here) for i in range(processes)]
+            failures[mode] = sum(int(writer.communicate()[0].split()[0]) for writer in writers)
+            elapsed = time.perf_counter() - began
+            if mode == "immediate":
+                record("shared.edits", elapsed / (processes * edits))
+                failures["stale stats"] = len(streak_store.check_stats(conn))
+            conn.close()
+            print(f"{mode:>9} {processes:>10} {processes * edits / elapsed:>9.0f} {failures[mode]:>13}")
+
+        path = os.path.join(tmp, "poll.db")
+        synthetic_database(path, *PROFILES["sparse"])
+        conn = streak_store.connect(path)
+        data_version = streak_store.poll_changes(conn)[0]
+        calls = 1_000
+        idle = record("shared.poll_idle",
+                      timed(lambda: [streak_store.poll_changes(conn, data_version) for _ in range(calls)]) / calls)
+        changed = record("shared.poll_changed", timed(streak_store.poll_changes, conn, None, repeat=5))
+        print(f"poll with no other writer: {idle * 1e6:.1f}us, after a commit ({PROFILES['sparse'][0]} modules): "
+              f"{changed * 1000:.2f}ms")
+
+        # Another connection edits the shown module, then one that is not shown
+        messagebox = streak_tracker.messagebox
+        streak_tracker.messagebox = StubMessagebox()
+        tracer = Tracer()
+        try:
+            app = headless_app(path, tracer)
+            settle(app, lambda: None, lambda: app.snapshot is not None and app.data_version is not None)
+            shown = app.snapshot.module_id
+            day = int(app.snapshot.run_ends[-1]) + 2
+
+            def loads():
+                return {stage: tracer.histograms[stage].count if stage in tracer.histograms else 0
+                        for stage in ("db load_snapshot", "db load_modules")}
+            before = loads()
+            with conn:
+                streak_store.record_date(conn, shown, date.fromordinal(day))
+            refresh = settle(app, lambda: None, lambda: app.snapshot is not None and app.snapshot.contains(
+                date.fromordinal(day)))
+            after_shown = loads()
+            # The app's own edits must not count as changes at the next poll
+            written = []
+            for offset in (4, 6):
+                app.run_write(streak_store.record_date, shown, date.fromordinal(day + offset),
+                              on_done=written.append)
+            settle(app, lambda: None, lambda: len(written) == 2)
+            other = next(module_id for module_id in app.module_ids.values() if module_id != shown)
+            version = app.module_versions.get(other)
+            with conn:
+                streak_store.record_date(conn, other, date.fromordinal(day))
+            settle(app, lambda: None, lambda: app.module_versions.get(other) != version and app.snapshot is not None)
+            after_other = loads()
+            app.on_close()
+        finally:
+            tracer.close()
+            streak_tracker.messagebox = messagebox
+        conn.close()
+        reloads = after_shown["db load_snapshot"] - before["db load_snapshot"]
+        needless = (after_other["db load_snapshot"] - after_shown["db load_snapshot"]
+                    + after_other["db load_modules"] - before["db load_modules"])
+        print(f"shown module edited elsewhere: on screen after {refresh:.3f}s "
+              f"(polled every {streak_tracker.CHANGE_POLL_INTERVAL} ms), {reloads} reload(s); "
+              f"other module edited after own edits: {needless} reload(s)")
+    if failures["immediate"]:
+        raise SystemExit(f"{failures['immediate']} edit(s) failed with several writers")
+    if failures["stale stats"]:
+        raise SystemExit("concurrent writers left stale module_stats")
+    if reloads != 1 or needless:
+        raise SystemExit("another process's edit did not reload exactly the module it changed")
+
+
+SEARCH_BUDGET = 0.05  # seconds per search, whatever the word
+
+
+def synthetic_notes(count, seed=0):
+    # Notes of four words each, from a vocabulary of made-up words with a
+    # Zipf distribution: the commonest word is in most notes, many in one.
+    rng = np.random.default_rng(seed)
+    syllables = np.array(["ka", "to", "ri", "me", "su", "lo", "na", "pe", "di", "go", "ba", "ve", "zu", "fi", "ho", "ne"])
+    vocabulary = sorted({"".join(rng.choice(syllables, rng.integers(2, 5))) for _ in range(40_000)})
+    rng.shuffle(vocabulary)
+    words = np.array(vocabulary)[np.minimum(rng.zipf(1.3, (count, 4)), len(vocabulary)) - 1]
+    return vocabulary, [" ".join(note) for note in words.tolist()]
+
+
+def bench_search(notes):
+    # Searches over `notes` notes in 50 modules: the notes_fts index against
+    # the LIKE scan it replaces, for words from the commonest to unique ones.
+    vocabulary, texts = synthetic_notes(notes)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        conn = temp_database(path, streak_store.connect)
+        conn.executemany("INSERT INTO modules (name) VALUES (?)", [(f"module {i}",) for i in range(50)])
+        modules = np.random.default_rng(1).integers(1, 51, notes).tolist()
+        first = date(2000, 1, 1).toordinal()
+        began = time.perf_counter()
+        with conn:
+            conn.executemany(streak_store.NOTE_UPSERT_SQL,
+                             ((first + i // 50, module_id, text) for i, (module_id, text) in enumerate(zip(modules, texts))))
+        write_time = record("search.note_insert", (time.perf_counter() - began) / notes)
+        # Searches read the database file, not the WAL the bulk load left behind
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        streak_store.check_notes_index(conn)
+        print(f"{notes} notes written at {1 / write_time:.0f} notes/s, index consistent")
+
+        queries = {"commonest word": vocabulary[0], "common word": vocabulary[10], "rare word": vocabulary[3000],
+                   "two words": f"{vocabulary[0]} {vocabulary[100]}", "typed prefix": vocabulary[10][:2],
+                   "typed partial word": vocabulary[0][:5],
+                   "long word": next(word for word in vocabulary if len(word) > streak_store.NOTE_PREFIXES[-1]),
+                   "no match": "qqqq"}
+
+        def like(text):
+            # Ranked the same way, so it has to look at every note
+            return conn.execute("SELECT module_id, date, note FROM streak_notes WHERE note LIKE ? "
+                                "ORDER BY length(note), id DESC LIMIT ?",
+                                (f"%{text}%", streak_store.NOTE_SEARCH_LIMIT)).fetchall()
+        def ranked(text):
+            # Every match sorted, to check that search_notes finds the best ones
+            return conn.execute(streak_store.NOTE_SEARCH_SQL.format("length(streak_notes.note), "),
+                                (streak_store.note_query(text), None, streak_store.NOTE_SEARCH_LIMIT)).fetchall()
+        print(f"{'query':>18} {'matches':>9} {'hits':>5} {'ranked':>6} {'search (ms)':>12} {'LIKE scan (ms)':>15}")
+        slow = []
+        misranked = []
+        for name, text in queries.items():
+            matches = conn.execute("SELECT COUNT(*) FROM notes_fts WHERE notes_fts MATCH ?",
+                                   (streak_store.note_query(text),)).fetchone()[0]
+            hits = streak_store.search_notes(conn, text)
+            seconds = record(f"search.{name.replace(' ', '_')}", timed(streak_store.search_notes, conn, text, repeat=5))
+            scan = timed(like, text)
+            exact = hits == ranked(text)
+            print(f"{name:>18} {matches:>9} {len(hits):>5} {'ok' if exact else 'FAIL':>6} {seconds * 1000:>12.2f} "
+                  f"{scan * 1000:>15.1f}")
+            slow += [name] * (seconds > SEARCH_BUDGET)
+            misranked += [name] * (not exact)
+
+        # An old short note outranks many newer, longer ones
+        with conn:
+            streak_store.set_note(conn.cursor(), 1, date(1999, 1, 1), "qqqq")
+            conn.executemany(streak_store.NOTE_UPSERT_SQL, ((first + notes // 50 + i, 1, f"long qqqq number {i}")
+                                                            for i in range(3_000)))
+        if streak_store.search_notes(conn, "qqqq", 10)[0][3] != "qqqq":
+            misranked.append("old short note")
+        # Past the indexed prefix, a typed word still starts a word, as the index folds it
+        with conn:
+            streak_store.set_note(conn.cursor(), 2, date(1999, 1, 1), "qqqqqqab zqqqqqqqqe")
+            streak_store.set_note(conn.cursor(), 2, date(1999, 1, 2), "Qqqqqqqqé")
+        if [hit[3] for hit in streak_store.search_notes(conn, "qqqqqqqqe")] != ["Qqqqqqqqé"]:
+            misranked.append("long word")
+        conn.close()
+
+        # Jumping from a hit shows its module with the plot centred on the day
+        import streak_tracker
+        from streak_plot import DATENUM_OFFSET
+
+        path = os.path.join(tmp, "jump.db")
+        synthetic_database(path, *PROFILES["sparse"])
+        messagebox = streak_tracker.messagebox
+        streak_tracker.messagebox = StubMessagebox()
+        try:
+            app = headless_app(path)
+            settle(app, lambda: None, lambda: app.snapshot is not None)
+            conn = streak_store.connect(path)
+            day = conn.execute("SELECT MAX(date) FROM streak_notes WHERE module_id = 7").fetchone()[0]
+            conn.close()
+            module_id, _, hit_day, note = app.db.call(streak_store.search_notes, f"note {day}")[0]
+            elapsed = settle(app, lambda: app.jump_to_day(module_id, hit_day),
+                             lambda: app.snapshot.module_id == module_id and app.focus_day is None)
+            x0, x1 = app.ax.get_xlim()
+            hover = app.renderer.hover
+            jumped = (hover.annot.get_visible() and note in hover.annot.get_text()
+                      and round((x0 + x1) / 2) == round(hit_day + DATENUM_OFFSET))
+            app.on_close()
+        finally:
+            streak_tracker.messagebox = messagebox
+        print(f"jump to a hit in another module: {elapsed * 1000:.1f}ms, {'ok' if jumped else 'FAIL'}")
+    if slow:
+        raise SystemExit(f"searches over {SEARCH_BUDGET * 1000:.0f} ms: {', '.join(slow)}")
+    if misranked:
+        raise SystemExit(f"searches missing better hits: {', '.join(misranked)}")
+    if not jumped:
+        raise SystemExit("jumping to a search hit did not centre the plot on its day")
+
+
+BENCHMARKS = {
+    "engine": lambda args: bench_engine(args.sizes),
+    "ingest": lambda args: bench_ingest(),
+    "plans": lambda args: check_query_plans(),
+    "stats": lambda args: check_stats_cache(),
+    "redraw": lambda args: bench_redraw(args.points),
+    "connection": lambda args: bench_connection(),
+    "dashboard": lambda args: bench_dashboard(args.modules),
+    "startup": lambda args: bench_startup(),
+    "cli": lambda args: bench_cli(),
+    "lifecycle": lambda args: bench_lifecycle(),
+    "io": lambda args: bench_io(args.rows),
+    "paths": lambda args: bench_paths(args.profiles),
+    "shared": lambda args: bench_shared(),
+    "search": lambda args: bench_search(args.notes),
+}
+REGRESSION_THRESHOLD = 0.5  # Allowed slowdown against the baseline, as a fraction
+REGRESSION_SLACK = 0.001  # seconds; differences below this are noise whatever the ratio
+
+
+def compare(baseline, threshold):
+    """Print every metric against ``baseline``; returns the names that regressed."""
+    regressions = []
+    print(f"{'metric':>44} {'baseline (s)':>13} {'now (s)':>11} {'change':>8}")
+    for name, seconds in RESULTS.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:>44} {'-':>13} {seconds:>11.6f} {'new':>8}")
+            continue
+        change = seconds / before - 1 if before else 0.0
+        regressed = change > threshold and seconds - before > REGRESSION_SLACK
+        regressions += [name] * regressed
+        print(f"{name:>44} {before:>13.6f} {seconds:>11.6f} {change:>+7.0%}{' !' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000],
+                        help="number of dates per engine run")
+    parser.add_argument("--points", type=int, nargs="+", default=[100, 10_000, 1_000_000],
+                        help="number of plotted points per redraw run")
+    parser.add_argument("--modules", type=int, nargs="+", default=[100, 1_000, 5_000],
+                        help="number of modules per dashboard run")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of days moved by the io run")
+    parser.add_argument("--notes", type=int, default=1_000_000, help="number of notes searched by the search run")
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES),
+                        help="synthetic databases for the paths run")
+    parser.add_argument("--json", metavar="PATH", help="write the recorded metrics to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="fail if a metric is slower than in this --json file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"allowed slowdown against the baseline (default: {REGRESSION_THRESHOLD})")
+    parser.add_argument("--profile", action="store_true", help="print the hottest functions under cProfile")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    for name in args.names or BENCHMARKS:
+        print(f"== {name} ==")
+        if profiler is None:
+            BENCHMARKS[name](args)
+        else:
+            profiler.runcall(BENCHMARKS[name], args)
+    if profiler is not None:
+        import pstats
+        print("== profile ==")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+
+    if args.json:
+        import platform
+        with open(args.json, "w") as f:
+            json.dump({"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "machine": platform.machine(), "results": RESULTS}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        print("== baseline ==")
+        regressions = compare(baseline, args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: "
+                             f"{', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
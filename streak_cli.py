@@ -0,0 +1,308 @@
+"""Command-line interface to the streak database, for scripts and cron jobs.
+
+    python streak_cli.py add "read 15min daily" 2025-05-09 --note "chapter 3"
+    python streak_cli.py add-range "read 15min daily" 2025-05-01 2025-05-08
+    python streak_cli.py delete-range "read 15min daily" 2025-05-03 2025-05-04
+    python streak_cli.py stats --json
+    python streak_cli.py search chapter
+    python streak_cli.py export "read 15min daily" > dates.csv
+    python streak_cli.py export --format columnar -o backup.stk
+    python streak_cli.py import --format columnar backup.stk
+    python streak_cli.py batch < commands.txt
+    python streak_cli.py vacuum --full
+
+``batch`` reads one command per line from stdin, in the same syntax as the
+command line, and applies them all in a single transaction: either every
+line is applied or, on the first bad line, none are. Blank lines and lines
+starting with ``#`` are skipped.
+
+Nothing here imports tkinter or matplotlib, and the schema and migrations
+are the same ``streak_store.create_tables`` the GUI runs.
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+from datetime import date
+
+import streak_io
+import streak_store
+
+DB_NAME = "streaks.db"
+# Commands that only write and may appear in a batch
+BATCH_COMMANDS = ("add", "add-range", "delete-range", "add-module", "delete-module")
+# Commands that read and then write, so they take the write lock up front
+WRITE_COMMANDS = BATCH_COMMANDS + ("import", "batch")
+
+
+class CommandError(Exception):
+    pass
+
+
+def parse_day(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {text!r}, expected YYYY-MM-DD")
+
+
+class Session:
+    """An open database plus a module name -> id cache."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.module_ids = {name: module_id for module_id, name in streak_store.load_modules(conn)}
+        self.pending = []  # (module_id, start, end) ranges waiting for one add_ranges call
+        self.added = 0  # Days added by every flush so far
+
+    def module_id(self, name):
+        if name not in self.module_ids:
+            raise CommandError(f"unknown module {name!r}")
+        return self.module_ids[name]
+
+    def flush(self):
+        # Queued additions go through add_ranges together, one read per module
+        added = streak_store.add_ranges(self.conn, self.pending) if self.pending else 0
+        self.pending = []
+        self.added += added
+        return added
+
+
+def cmd_add(session, args):
+    module_id = session.module_id(args.module)
+    if args.note:
+        session.flush()
+        return streak_store.record_date(session.conn, module_id, args.day, args.note)
+    session.pending.append((module_id, args.day, args.day))
+
+
+def cmd_add_range(session, args):
+    if args.end < args.start:
+        raise CommandError(f"range end {args.end} is before start {args.start}")
+    session.pending.append((session.module_id(args.module), args.start, args.end))
+
+
+def cmd_delete_range(session, args):
+    if args.end < args.start:
+        raise CommandError(f"range end {args.end} is before start {args.start}")
+    session.flush()
+    return streak_store.remove_dates(session.conn, session.module_id(args.module), args.start, args.end)
+
+
+def cmd_add_module(session, args):
+    session.flush()
+    if args.module in session.module_ids:
+        raise CommandError(f"module {args.module!r} already exists")
+    session.module_ids[args.module] = streak_store.add_module(session.conn, args.module)
+
+
+def cmd_delete_module(session, args):
+    session.flush()
+    session.module_id(args.module)
+    streak_store.delete_module(session.conn, args.module)
+    del session.module_ids[args.module]
+
+
+def cmd_vacuum(session, args):
+    if args.full:
+        before, after = streak_store.vacuum(session.conn)
+        print(f"rebuilt the database: {before} -> {after} bytes", file=sys.stderr)
+        return
+    if session.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        raise CommandError("the database predates incremental vacuum; run `vacuum --full` once")
+    while streak_store.vacuum_step(session.conn):
+        pass
+
+
+def cmd_modules(session, args):
+    for name in sorted(session.module_ids):
+        print(name)
+
+
+def cmd_stats(session, args):
+    summaries = streak_store.load_summaries(session.conn, args.today, days=0)
+    rows = [
+        {"module": name, "current_streak": int(current), "max_streak": int(max_streak), "breaks": int(breaks)}
+        for name, current, max_streak, breaks in zip(
+            summaries.names, summaries.current_streaks, summaries.max_streaks, summaries.break_counts)
+        if not args.modules or name in args.modules
+    ]
+    missing = set(args.modules) - {row["module"] for row in rows}
+    if missing:
+        raise CommandError(f"unknown module(s): {', '.join(sorted(missing))}")
+    rows.sort(key=lambda row: row["module"])
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    width = max([len(row["module"]) for row in rows] + [6])
+    print(f"{'module':<{width}} {'current':>8} {'highest':>8} {'breaks':>7}")
+    for row in rows:
+        print(f"{row['module']:<{width}} {row['current_streak']:>8} {row['max_streak']:>8} {row['breaks']:>7}")
+
+
+def cmd_search(session, args):
+    hits = streak_store.search_notes(session.conn, " ".join(args.words), args.limit)
+    rows = [{"module": name, "date": streak_store.decode_date(day).isoformat(), "note": note}
+            for _, name, day, note in hits]
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    width = max([len(row["module"]) for row in rows] + [6])
+    for row in rows:
+        print(f"{row['module']:<{width}} {row['date']} {row['note']}")
+
+
+def cmd_export(session, args):
+    for name in args.modules:
+        session.module_id(name)
+    names = set(args.modules) if args.modules else None
+    export = streak_io.FORMATS[args.format][1]
+    if args.output == "-":
+        binary = streak_io.FORMATS[args.format][0]
+        return export(session.conn, sys.stdout.buffer if binary else sys.stdout, names)
+    return streak_io.export_file(session.conn, args.output, args.format, names)
+
+
+def cmd_import(session, args):
+    session.flush()
+    if args.input == "-":
+        binary, _, load = streak_io.FORMATS[args.format]
+        added = load(session.conn, sys.stdin.buffer if binary else sys.stdin)
+    else:
+        added = streak_io.import_file(session.conn, args.input, args.format)
+    # New modules were created behind the session's back
+    session.module_ids = {name: module_id for module_id, name in streak_store.load_modules(session.conn)}
+    print(f"added {added} day(s)", file=sys.stderr)
+    return added
+
+
+def cmd_batch(session, args):
+    parser = build_parser(batch=True)
+    added = removed = 0
+    for number, line in enumerate(sys.stdin, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            command = parser.parse_args(shlex.split(line))
+            result = command.func(session, command)
+        except (CommandError, ValueError, argparse.ArgumentError) as e:
+            raise CommandError(f"line {number}: {e}")
+        except SystemExit:
+            raise CommandError(f"line {number}: could not parse {line!r}")
+        if command.func is cmd_delete_range:
+            removed += result
+        elif result:
+            added += result
+    session.flush()
+    print(f"added {added + session.added} day(s), removed {removed} day(s)", file=sys.stderr)
+
+
+def build_parser(batch=False):
+    parser = argparse.ArgumentParser(prog="streak_cli.py" if not batch else "batch line",
+                                     description=__doc__.splitlines()[0], exit_on_error=not batch)
+    if not batch:
+        parser.add_argument("--db", default=DB_NAME, help=f"database file (default: {DB_NAME})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="record one day")
+    add.add_argument("module")
+    add.add_argument("day", type=parse_day)
+    add.add_argument("--note", default="")
+    add.set_defaults(func=cmd_add)
+
+    for name, func, help_text in (("add-range", cmd_add_range, "record every day from START to END"),
+                                  ("delete-range", cmd_delete_range, "forget every day from START to END")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("module")
+        command.add_argument("start", type=parse_day)
+        command.add_argument("end", type=parse_day)
+        command.set_defaults(func=func)
+
+    add_module = commands.add_parser("add-module", help="create a module")
+    add_module.add_argument("module")
+    add_module.set_defaults(func=cmd_add_module)
+
+    delete_module = commands.add_parser("delete-module", help="delete a module with all of its days and notes")
+    delete_module.add_argument("module")
+    delete_module.set_defaults(func=cmd_delete_module)
+    if batch:
+        return parser
+
+    commands.add_parser("modules", help="list modules").set_defaults(func=cmd_modules)
+
+    stats = commands.add_parser("stats", help="current streak, highest streak and breaks per module")
+    stats.add_argument("modules", nargs="*")
+    stats.add_argument("--today", type=parse_day, default=None, help="count current streaks as of this day")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(func=cmd_stats)
+
+    search = commands.add_parser("search", help="notes holding every word, the last one as a prefix, best first")
+    search.add_argument("words", nargs="+")
+    search.add_argument("--limit", type=int, default=streak_store.NOTE_SEARCH_LIMIT)
+    search.add_argument("--json", action="store_true")
+    search.set_defaults(func=cmd_search)
+
+    export = commands.add_parser("export", help="write every recorded day, or a snapshot, to a file or stdout")
+    export.add_argument("modules", nargs="*")
+    export.add_argument("--format", choices=streak_io.FORMATS, default="csv")
+    export.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    export.set_defaults(func=cmd_export)
+
+    import_command = commands.add_parser("import", help="add the days and notes of an exported file")
+    import_command.add_argument("input", help="input file, or - for stdin")
+    import_command.add_argument("--format", choices=streak_io.FORMATS, default="csv")
+    import_command.set_defaults(func=cmd_import)
+
+    vacuum = commands.add_parser("vacuum", help="return free pages to the file system")
+    vacuum.add_argument("--full", action="store_true",
+                        help="rebuild the whole file, enabling incremental vacuum on older databases")
+    vacuum.set_defaults(func=cmd_vacuum)
+
+    batch_command = commands.add_parser("batch", help=f"apply {', '.join(BATCH_COMMANDS)} lines from stdin")
+    batch_command.set_defaults(func=cmd_batch)
+    return parser
+
+
+def execute(args):
+    """Run parsed command-line ``args`` in a single transaction.
+
+    Writing commands begin with ``BEGIN IMMEDIATE``: the module names they
+    resolve and the runs they merge with cannot be changed by another
+    process before they commit.
+    """
+    conn = streak_store.connect(args.db)
+    try:
+        streak_store.create_tables(conn)
+        with conn:
+            if args.command in WRITE_COMMANDS:
+                conn.execute("BEGIN IMMEDIATE")
+            session = Session(conn)
+            result = args.func(session, args)
+            session.flush()
+        return result
+    finally:
+        conn.close()
+
+
+def run(argv):
+    """Run one command line, e.g. ``run(["--db", path, "add", "reading", "2025-05-09"])``."""
+    return execute(build_parser().parse_args(argv))
+
+
+def main():
+    try:
+        run(sys.argv[1:])
+    except CommandError as e:
+        raise SystemExit(f"error: {e}")
+    except BrokenPipeError:
+        # stdout was closed early, e.g. by `| head`; silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Headless streak computation shared by the GUI and batch tooling.
+
+Dates are handled as proleptic Gregorian day ordinals (``date.toordinal()``)
+so a whole history, or a whole batch of modules, is scored in a single
+vectorized NumPy pass.
+"""
+from bisect import bisect_right
+from datetime import date
+
+import numpy as np
+
+
+class StreakResult:
+    """Per-date streak data for one sorted series of day ordinals.
+
+    ``lengths[i]`` is the streak length on ``ordinals[i]``. ``run_starts`` and
+    ``run_ends`` are inclusive index bounds of each contiguous run and
+    ``breaks`` holds the indices of the first date after every gap.
+    """
+
+    def __init__(self, ordinals, lengths, run_starts, run_ends):
+        self.ordinals = ordinals
+        self.lengths = lengths
+        self.run_starts = run_starts
+        self.run_ends = run_ends
+        self.breaks = run_starts[1:]
+        self.max_streak = int(self.run_lengths.max()) if run_starts.size else 0
+
+    @property
+    def run_lengths(self):
+        return self.run_ends - self.run_starts + 1
+
+    @property
+    def max_streak_indices(self):
+        if not self.lengths.size:
+            return self.lengths
+        return np.flatnonzero(self.lengths == self.max_streak)
+
+    def current_streak(self, today=None):
+        """Length of the last run, or 0 if it ended before yesterday."""
+        if not self.lengths.size:
+            return 0
+        if today is not None:
+            if isinstance(today, date):
+                today = today.toordinal()
+            if self.ordinals[-1] < today - 1:
+                return 0
+        return int(self.lengths[-1])
+
+
+class BatchResult:
+    """Per-module summary arrays for a batch scored by ``compute_batch``."""
+
+    def __init__(self, module_ids, max_streaks, break_counts, current_streaks, result):
+        self.module_ids = module_ids
+        self.max_streaks = max_streaks
+        self.break_counts = break_counts
+        self.current_streaks = current_streaks
+        self.result = result
+
+    def as_dict(self):
+        return {
+            int(module_id): {
+                "max_streak": int(max_streak),
+                "breaks": int(breaks),
+                "current_streak": int(current),
+            }
+            for module_id, max_streak, breaks, current in zip(
+                self.module_ids, self.max_streaks, self.break_counts, self.current_streaks)
+        }
+
+
+class ModuleSummaries:
+    """Dashboard data for every module as parallel arrays.
+
+    ``recent[i]`` holds module ``i``'s streak length on each of the last
+    ``recent.shape[1]`` days, oldest first.
+    """
+
+    def __init__(self, module_ids, names, max_streaks, break_counts, current_streaks, recent):
+        self.module_ids = module_ids
+        self.names = names
+        self.max_streaks = max_streaks
+        self.break_counts = break_counts
+        self.current_streaks = current_streaks
+        self.recent = recent
+
+    def __len__(self):
+        return len(self.names)
+
+
+class StreakDelta:
+    """A single-day change to a ``ModuleSnapshot``.
+
+    ``index`` is the position of ``day`` in the snapshot's ordinals (where
+    it was inserted, or where it was removed from) and
+    ``lengths[changed_start:changed_stop]`` are the only streak lengths that
+    differ from before the change.
+    """
+
+    def __init__(self, day, index, added, changed_start, changed_stop):
+        self.day = day
+        self.index = index
+        self.added = added
+        self.changed_start = changed_start
+        self.changed_stop = changed_stop
+
+
+class ModuleSnapshot:
+    """One module's runs, per-date streaks and notes.
+
+    The GUI keeps a snapshot for the selected module and reuses it until a
+    write invalidates it. Single-day edits are applied in place with
+    ``add_day``/``remove_day``, which find the affected run by bisection and
+    only rewrite the streak lengths of that run. ``version`` is the store's
+    version of the module when it was loaded.
+    """
+
+    def __init__(self, module_id, run_starts, run_ends, notes, version=None):
+        self.module_id = module_id
+        self.version = version
+        self.notes = notes
+        self.streaks = compute_runs(run_starts, run_ends)
+        # Plain int lists: bisect on them is cheaper than on NumPy scalars
+        self.run_starts = np.asarray(run_starts, dtype=np.int64).tolist()
+        self.run_ends = np.asarray(run_ends, dtype=np.int64).tolist()
+
+    def contains(self, day):
+        ordinal = day.toordinal()
+        run = bisect_right(self.run_starts, ordinal) - 1
+        return run >= 0 and ordinal <= self.run_ends[run]
+
+    def add_day(self, day, note=None):
+        """Record ``day``; returns a ``StreakDelta`` or None if already present."""
+        ordinal = day.toordinal()
+        run = bisect_right(self.run_starts, ordinal) - 1
+        if run >= 0 and ordinal <= self.run_ends[run]:
+            return None
+        joins_previous = run >= 0 and self.run_ends[run] == ordinal - 1
+        joins_next = run + 1 < len(self.run_starts) and self.run_starts[run + 1] == ordinal + 1
+        if joins_previous and joins_next:
+            self.run_ends[run] = self.run_ends.pop(run + 1)
+            del self.run_starts[run + 1]
+        elif joins_previous:
+            self.run_ends[run] = ordinal
+        elif joins_next:
+            run += 1
+            self.run_starts[run] = ordinal
+        else:
+            run += 1
+            self.run_starts.insert(run, ordinal)
+            self.run_ends.insert(run, ordinal)
+        self.set_note(day, note)
+
+        index = int(np.searchsorted(self.streaks.ordinals, ordinal))
+        ordinals = np.insert(self.streaks.ordinals, index, ordinal)
+        lengths = np.insert(self.streaks.lengths, index, 0)
+        changed_start, changed_stop = self._patch(ordinals, lengths, [run], index)
+        return StreakDelta(day, index, True, changed_start, changed_stop)
+
+    def remove_day(self, day):
+        """Forget ``day``; returns a ``StreakDelta`` or None if it was absent."""
+        ordinal = day.toordinal()
+        run = bisect_right(self.run_starts, ordinal) - 1
+        if run < 0 or ordinal > self.run_ends[run]:
+            return None
+        start, end = self.run_starts[run], self.run_ends[run]
+        patched = []
+        if start == end:
+            del self.run_starts[run]
+            del self.run_ends[run]
+        elif ordinal == start:
+            self.run_starts[run] = ordinal + 1
+            patched.append(run)
+        elif ordinal == end:
+            self.run_ends[run] = ordinal - 1
+        else:
+            self.run_ends[run] = ordinal - 1
+            self.run_starts.insert(run + 1, ordinal + 1)
+            self.run_ends.insert(run + 1, end)
+            patched.append(run + 1)
+        self.notes.pop(day, None)
+
+        index = int(np.searchsorted(self.streaks.ordinals, ordinal))
+        ordinals = np.delete(self.streaks.ordinals, index)
+        lengths = np.delete(self.streaks.lengths, index)
+        changed_start, changed_stop = self._patch(ordinals, lengths, patched, index)
+        return StreakDelta(day, index, False, changed_start, changed_stop)
+
+    def set_note(self, day, note):
+        if note:
+            self.notes[day] = note
+        else:
+            self.notes.pop(day, None)
+
+    def _patch(self, ordinals, lengths, runs, index):
+        # Run index bounds are O(runs); only the given runs' lengths are redone.
+        run_lengths = np.asarray(self.run_ends, dtype=np.int64) - np.asarray(self.run_starts, dtype=np.int64) + 1
+        run_ends = np.cumsum(run_lengths) - 1
+        run_starts = run_ends - run_lengths + 1
+        changed_start = changed_stop = index
+        for run in runs:
+            first, last = int(run_starts[run]), int(run_ends[run])
+            lengths[first:last + 1] = np.arange(1, last - first + 2)
+            changed_start, changed_stop = min(changed_start, first), max(changed_stop, last + 1)
+        self.streaks = StreakResult(ordinals, lengths, run_starts, run_ends)
+        return changed_start, changed_stop
+
+
+def to_ordinals(dates):
+    return np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+
+
+def _streaks_from_run_flags(ordinals, new_run):
+    n = ordinals.size
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.empty_like(run_starts)
+    run_ends[:-1] = run_starts[1:] - 1
+    run_ends[-1] = n - 1
+    run_lengths = run_ends - run_starts + 1
+    lengths = np.arange(1, n + 1, dtype=np.int64) - np.repeat(run_starts, run_lengths)
+    return StreakResult(ordinals, lengths, run_starts, run_ends)
+
+
+def _empty_result():
+    empty = np.empty(0, dtype=np.int64)
+    return StreakResult(empty, empty, empty, empty)
+
+
+def compute_streaks(ordinals):
+    """Score one module's sorted, de-duplicated day ordinals."""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    if not ordinals.size:
+        return _empty_result()
+    new_run = np.empty(ordinals.size, dtype=bool)
+    new_run[0] = True
+    np.not_equal(np.diff(ordinals), 1, out=new_run[1:])
+    return _streaks_from_run_flags(ordinals, new_run)
+
+
+def compute_runs(starts, ends):
+    """Build per-date streak data from sorted, non-adjacent inclusive runs.
+
+    ``starts`` and ``ends`` are day ordinals as stored by the run-length
+    table; run boundaries, breaks and the max streak cost O(runs).
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if not starts.size:
+        return _empty_result()
+    run_lengths = ends - starts + 1
+    run_ends = np.cumsum(run_lengths) - 1
+    run_starts = run_ends - run_lengths + 1
+    lengths = np.arange(1, int(run_ends[-1]) + 2, dtype=np.int64) - np.repeat(run_starts, run_lengths)
+    ordinals = np.repeat(starts, run_lengths) + lengths - 1
+    return StreakResult(ordinals, lengths, run_starts, run_ends)
+
+
+def compute_batch(ordinals, module_ids, today=None):
+    """Score many modules at once.
+
+    ``ordinals`` and ``module_ids`` are parallel arrays sorted by
+    ``(module_id, ordinal)``, e.g. straight from
+    ``SELECT module_id, date ... ORDER BY module_id, date``.
+    """
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    module_ids = np.asarray(module_ids, dtype=np.int64)
+    if not ordinals.size:
+        empty = np.empty(0, dtype=np.int64)
+        return BatchResult(empty, empty, empty, empty, _empty_result())
+
+    new_module = np.empty(ordinals.size, dtype=bool)
+    new_module[0] = True
+    np.not_equal(module_ids[1:], module_ids[:-1], out=new_module[1:])
+    new_run = new_module.copy()
+    new_run[1:] |= np.diff(ordinals) != 1
+    result = _streaks_from_run_flags(ordinals, new_run)
+
+    module_starts = np.flatnonzero(new_module)
+    # Map every run to the module it belongs to, then reduce per module.
+    run_module = np.cumsum(new_module)[result.run_starts] - 1
+    module_run_starts = np.searchsorted(run_module, np.arange(module_starts.size))
+    max_streaks = np.maximum.reduceat(result.run_lengths, module_run_starts)
+    break_counts = np.diff(np.append(module_run_starts, result.run_starts.size)) - 1
+
+    module_ends = np.append(module_starts[1:], ordinals.size) - 1
+    current_streaks = result.lengths[module_ends].copy()
+    if today is not None:
+        if isinstance(today, date):
+            today = today.toordinal()
+        current_streaks[ordinals[module_ends] < today - 1] = 0
+
+    return BatchResult(module_ids[module_starts], max_streaks, break_counts, current_streaks, result)
+
+
+def recent_streaks(module_ids, run_modules, starts, ends, today, days):
+    """Streak length per module on each of the ``days`` days ending ``today``.
+
+    Returns a ``(len(module_ids), days)`` array in ``module_ids`` order. Runs
+    are given as parallel arrays and may come in any order; runs of modules
+    missing from ``module_ids`` are ignored.
+    """
+    module_ids = np.asarray(module_ids, dtype=np.int64)
+    run_modules = np.asarray(run_modules, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if isinstance(today, date):
+        today = today.toordinal()
+    first = today - days + 1
+    recent = np.zeros((module_ids.size, days), dtype=np.int64)
+    if not module_ids.size:
+        return recent
+
+    order = np.argsort(module_ids)
+    rows = order[np.minimum(np.searchsorted(module_ids, run_modules, sorter=order), module_ids.size - 1)]
+    keep = (module_ids[rows] == run_modules) & (ends >= first) & (starts <= today)
+    rows, starts = rows[keep], starts[keep]
+    lows, highs = np.maximum(starts, first), np.minimum(ends[keep], today)
+    counts = highs - lows + 1
+    # Expand every clipped run into its days, as in compute_runs.
+    run_index = np.repeat(np.arange(counts.size), counts)
+    ordinals = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + lows[run_index]
+    recent[rows[run_index], ordinals - first] = ordinals - starts[run_index] + 1
+    return recent
@@ -0,0 +1,255 @@
+"""Streaming import and export of modules, days and notes.
+
+Rows are ``(module_name, day, note)`` tuples, where ``day`` is an integer
+day number as stored by ``streak_store`` and ``note`` is None when there is
+none. Readers are generators and writers consume generators, so memory stays
+flat however many rows move through them.
+
+Formats:
+
+``csv``
+    A ``module,date,note`` header, then one day per line.
+``jsonl``
+    One ``{"module": ..., "date": ..., "note": ...}`` object per line.
+``columnar``
+    A compact binary snapshot. Per module it stores the run bounds as
+    little-endian int32 day numbers, and the notes as day numbers plus
+    offsets into one UTF-8 blob. It is written and read run by run instead
+    of day by day.
+
+Imports add to whatever is already in the database, creating modules by
+name as needed. Like the ``streak_store`` helpers they do not commit, so a
+whole file lands in the caller's single transaction.
+"""
+import csv
+import json
+import struct
+from datetime import date
+
+import streak_store
+
+CHUNK_SIZE = 10_000  # Spans or notes per executemany
+CSV_HEADER = ("module", "date", "note")
+COLUMNAR_MAGIC = b"STRKCOL1"
+# Per module: name bytes, runs, notes, note blob bytes
+COLUMNAR_BLOCK = struct.Struct("<IIII")
+
+
+def iter_rows(conn, module_names=None):
+    """Every recorded day, module by module, as ``(module_name, day, note)``."""
+    for module_id, name in streak_store.load_modules(conn):
+        if module_names is not None and name not in module_names:
+            continue
+        notes = dict(conn.execute(streak_store.NOTES_BY_MODULE_SQL, (module_id,)))
+        for start, end in conn.execute(streak_store.RUNS_BY_MODULE_SQL, (module_id,)):
+            for day in range(start, end + 1):
+                yield name, day, notes.get(day)
+
+
+def write_csv(rows, f):
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for count, (name, day, note) in enumerate(rows, 1):
+        writer.writerow((name, date.fromordinal(day).isoformat(), note or ""))
+    return count
+
+
+def read_csv(f):
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is not None and tuple(header) != CSV_HEADER:
+        raise ValueError(f"expected a {','.join(CSV_HEADER)} header, got {','.join(header)}")
+    for name, day, note in reader:
+        yield name, date.fromisoformat(day).toordinal(), note or None
+
+
+def write_jsonl(rows, f):
+    count = 0
+    for count, (name, day, note) in enumerate(rows, 1):
+        f.write(json.dumps({"module": name, "date": date.fromordinal(day).isoformat(), "note": note}))
+        f.write("\n")
+    return count
+
+
+def read_jsonl(f):
+    for line in f:
+        if line.strip():
+            row = json.loads(line)
+            yield row["module"], date.fromisoformat(row["date"]).toordinal(), row.get("note") or None
+
+
+def write_columnar(conn, f, module_names=None):
+    import numpy as np
+
+    f.write(COLUMNAR_MAGIC)
+    count = 0
+    for module_id, name in streak_store.load_modules(conn):
+        if module_names is not None and name not in module_names:
+            continue
+        starts, ends = streak_store.load_runs(conn, module_id)
+        note_rows = conn.execute(streak_store.NOTES_BY_MODULE_SQL, (module_id,)).fetchall()
+        encoded = [note.encode() for _, note in note_rows]
+        offsets = np.cumsum([0] + [len(note) for note in encoded], dtype=np.uint32)
+        name_bytes = name.encode()
+        f.write(COLUMNAR_BLOCK.pack(len(name_bytes), starts.size, len(note_rows), int(offsets[-1])))
+        f.write(name_bytes)
+        f.write(starts.astype("<i4").tobytes())
+        f.write(ends.astype("<i4").tobytes())
+        f.write(np.array([day for day, _ in note_rows], dtype="<i4").tobytes())
+        f.write(offsets.astype("<u4").tobytes())
+        f.write(b"".join(encoded))
+        count += int((ends - starts + 1).sum())
+    return count
+
+
+def read_columnar(f):
+    """Yield ``(module_name, starts, ends, notes)`` per module block.
+
+    ``starts`` and ``ends`` are int32 arrays; ``notes`` is a list of
+    ``(day, note)`` pairs.
+    """
+    import numpy as np
+
+    if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("not a columnar streak snapshot")
+
+    def read_exactly(size):
+        data = f.read(size)
+        if len(data) != size:
+            raise ValueError("columnar snapshot is truncated")
+        return data
+
+    while True:
+        block = f.read(COLUMNAR_BLOCK.size)
+        if not block:
+            return
+        if len(block) != COLUMNAR_BLOCK.size:
+            raise ValueError("columnar snapshot is truncated")
+        name_size, runs, note_count, blob_size = COLUMNAR_BLOCK.unpack(block)
+        name = read_exactly(name_size).decode()
+        starts = np.frombuffer(read_exactly(4 * runs), dtype="<i4")
+        ends = np.frombuffer(read_exactly(4 * runs), dtype="<i4")
+        note_days = np.frombuffer(read_exactly(4 * note_count), dtype="<i4").tolist()
+        offsets = np.frombuffer(read_exactly(4 * (note_count + 1)), dtype="<u4").tolist()
+        blob = read_exactly(blob_size)
+        notes = [(day, blob[offsets[i]:offsets[i + 1]].decode()) for i, day in enumerate(note_days)]
+        yield name, starts, ends, notes
+
+
+class _Importer:
+    # Resolves module names and sends spans and notes in CHUNK_SIZE batches.
+
+    def __init__(self, conn, chunk_size):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.module_ids = {name: module_id for module_id, name in streak_store.load_modules(conn)}
+        self.spans = []
+        self.notes = []
+        self.added = 0
+
+    def module_id(self, name):
+        module_id = self.module_ids.get(name)
+        if module_id is None:
+            module_id = self.module_ids[name] = streak_store.add_module(self.conn, name)
+        return module_id
+
+    def add_span(self, span):
+        self.spans.append(span)
+        if len(self.spans) >= self.chunk_size:
+            self.flush_spans()
+
+    def add_note(self, note_row):
+        self.notes.append(note_row)
+        if len(self.notes) >= self.chunk_size:
+            self.flush_notes()
+
+    def flush_spans(self):
+        self.added += streak_store.add_spans(self.conn, self.spans)
+        self.spans = []
+
+    def flush_notes(self):
+        self.conn.executemany(streak_store.NOTE_UPSERT_SQL, self.notes)
+        self.notes = []
+
+    def finish(self):
+        self.flush_spans()
+        self.flush_notes()
+        return self.added
+
+
+def import_rows(conn, rows, chunk_size=CHUNK_SIZE):
+    """Record ``(module_name, day, note)`` rows; returns the number of new days.
+
+    Consecutive days of a module are collapsed into one span before they
+    reach the database, so sorted input costs one span per run.
+    """
+    importer = _Importer(conn, chunk_size)
+    span = None
+    for name, day, note in rows:
+        module_id = importer.module_id(name)
+        if note:
+            importer.add_note((day, module_id, note))
+        if span is not None and span[0] == module_id and span[1] <= day <= span[2] + 1:
+            span[2] = max(span[2], day)
+            continue
+        if span is not None:
+            importer.add_span(tuple(span))
+        span = [module_id, day, day]
+    if span is not None:
+        importer.add_span(tuple(span))
+    return importer.finish()
+
+
+def import_columnar(conn, f, chunk_size=CHUNK_SIZE):
+    """Record a columnar snapshot; returns the number of new days."""
+    importer = _Importer(conn, chunk_size)
+    for name, starts, ends, notes in read_columnar(f):
+        module_id = importer.module_id(name)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            importer.add_span((module_id, start, end))
+        for day, note in notes:
+            importer.add_note((day, module_id, note))
+    return importer.finish()
+
+
+def export_csv(conn, f, module_names=None):
+    return write_csv(iter_rows(conn, module_names), f)
+
+
+def import_csv(conn, f):
+    return import_rows(conn, read_csv(f))
+
+
+def export_jsonl(conn, f, module_names=None):
+    return write_jsonl(iter_rows(conn, module_names), f)
+
+
+def import_jsonl(conn, f):
+    return import_rows(conn, read_jsonl(f))
+
+
+# name -> (binary file, export(conn, f, module_names), import(conn, f))
+FORMATS = {
+    "csv": (False, export_csv, import_csv),
+    "jsonl": (False, export_jsonl, import_jsonl),
+    "columnar": (True, write_columnar, import_columnar),
+}
+
+
+def open_file(path, mode, fmt):
+    if FORMATS[fmt][0]:
+        return open(path, mode + "b")
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def export_file(conn, path, fmt, module_names=None):
+    """Write the database, or just ``module_names``, to ``path``; returns rows written."""
+    with open_file(path, "w", fmt) as f:
+        return FORMATS[fmt][1](conn, f, module_names)
+
+
+def import_file(conn, path, fmt):
+    """Add the contents of ``path`` to the database; returns the number of new days."""
+    with open_file(path, "r", fmt) as f:
+        return FORMATS[fmt][2](conn, f)
@@ -0,0 +1,481 @@
+"""Matplotlib helpers for the streak plot."""
+from datetime import date
+
+import numpy as np
+import matplotlib.dates as mdates
+
+# Matplotlib date numbers are day ordinals shifted by a constant epoch offset.
+_EPOCH = date(1970, 1, 1)
+DATENUM_OFFSET = mdates.date2num(_EPOCH) - _EPOCH.toordinal()
+FOCUS_DAYS = 45  # Days shown either side of a day jumped to
+
+
+def ordinals_to_datenums(ordinals):
+    return np.asarray(ordinals, dtype=np.float64) + DATENUM_OFFSET
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max index pyramid for level-of-detail plotting.
+
+    Level ``k`` splits the series into buckets of ``2**k`` consecutive points
+    and keeps the index of each bucket's minimum and maximum, so sawtooth
+    peaks and resets survive decimation. Building costs O(n) once per data
+    change, and ``patch`` redoes only the buckets after an edit; ``indices``
+    then picks the coarsest level that still has at least one bucket per
+    pixel for the visible slice.
+    """
+
+    def __init__(self, values):
+        self.levels = []
+        self.patch(values, 0)
+
+    def patch(self, values, start):
+        """Switch to ``values``, which only differ from the current ones from ``start`` on."""
+        self.values = np.asarray(values)
+        self.size = self.values.size
+        levels = []
+        # Each level is the one below paired up; from the first pair holding a changed point on
+        mins = maxs = np.arange(self.size)
+        while mins.size > 1:
+            first = start >> 1
+            tail_mins, tail_maxs = mins[2 * first:], maxs[2 * first:]
+            if tail_mins.size % 2:
+                tail_mins = np.append(tail_mins, tail_mins[-1])
+                tail_maxs = np.append(tail_maxs, tail_maxs[-1])
+            left_min, right_min = tail_mins[0::2], tail_mins[1::2]
+            left_max, right_max = tail_maxs[0::2], tail_maxs[1::2]
+            mins = np.where(self.values[right_min] < self.values[left_min], right_min, left_min)
+            maxs = np.where(self.values[right_max] > self.values[left_max], right_max, left_max)
+            if first:
+                old_mins, old_maxs = self.levels[len(levels)]
+                mins = np.concatenate([old_mins[:first], mins])
+                maxs = np.concatenate([old_maxs[:first], maxs])
+            levels.append((mins, maxs))
+            start = first
+        self.levels = levels
+
+    def indices(self, start, stop, buckets):
+        """Sorted indices to draw for ``values[start:stop]`` at ``buckets`` pixels."""
+        start, stop = max(start, 0), min(stop, self.size)
+        if stop - start <= 2 * buckets:
+            return np.arange(start, stop)
+        level = max(int(np.ceil(np.log2((stop - start) / buckets))), 1)
+        mins, maxs = self.levels[min(level, len(self.levels)) - 1]
+        first, last = start >> level, (stop - 1) >> level
+        # Whole buckets come from the pyramid; the two partial edge buckets
+        # are scanned directly so points outside [start, stop) never leak in.
+        head_stop, tail_start = min((first + 1) << level, stop), max(last << level, start)
+        head, tail = self.values[start:head_stop], self.values[tail_start:stop]
+        picked = np.concatenate([
+            mins[first + 1:last], maxs[first + 1:last], [start, stop - 1],
+            [start + head.argmin(), start + head.argmax(), tail_start + tail.argmin(), tail_start + tail.argmax()],
+        ])
+        return np.unique(picked)
+
+
+def thin_to_pixels(xs, x0, x1, pixels):
+    """Indices of ``xs`` inside [x0, x1], at most one per pixel column."""
+    start, stop = np.searchsorted(xs, [x0, x1], side='left')
+    stop = max(stop, start)
+    if stop - start <= pixels:
+        return np.arange(start, stop)
+    columns = ((xs[start:stop] - x0) * (pixels / (x1 - x0))).astype(np.int64)
+    return start + np.unique(columns, return_index=True)[1]
+
+
+class HoverController:
+    """Tooltip for the streak line, connected to the canvas exactly once.
+
+    Replots hand over new data with ``set_data``; the point under the mouse
+    is found by bisecting the sorted date ordinals instead of hit-testing
+    every marker. The annotation is an animated artist: when the hovered
+    point changes it is blitted over a cached background instead of
+    redrawing the figure.
+    """
+
+    def __init__(self, canvas, ax, pick_radius=5):
+        self.canvas = canvas
+        self.ax = ax
+        self.pick_radius = pick_radius
+        self.ordinals = np.empty(0, dtype=np.int64)
+        self.lengths = np.empty(0, dtype=np.int64)
+        self.notes = {}
+        self.hovered = None
+        self.background = None
+        self.annot = ax.annotate("", xy=(0, 0), xytext=(15, 15), textcoords="offset points",
+                                 bbox=dict(boxstyle="round", fc="w", alpha=0.9),
+                                 arrowprops=dict(arrowstyle="->"), animated=True)
+        self.annot.set_visible(False)
+        canvas.mpl_connect("motion_notify_event", self.on_motion)
+        canvas.mpl_connect("draw_event", self.on_draw)
+
+    def set_data(self, ordinals, lengths, notes):
+        self.ordinals = ordinals
+        self.lengths = lengths
+        self.notes = notes
+        self.hovered = None
+        self.annot.set_visible(False)
+
+    def on_draw(self, event):
+        # Animated artists are skipped by full draws, so this is the clean background
+        if getattr(self.canvas, "supports_blit", False):
+            self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+            if self.annot.get_visible() and self.ax.get_visible():
+                # A pinned tooltip outlives the redraw that moved the view to it
+                self.ax.draw_artist(self.annot)
+                self.canvas.blit(self.canvas.figure.bbox)
+
+    def index_of(self, ordinal):
+        i = int(np.searchsorted(self.ordinals, ordinal))
+        return i if i < self.ordinals.size and self.ordinals[i] == ordinal else None
+
+    def pin(self, ordinal):
+        """Show the tooltip of day ``ordinal`` as if it were hovered; False if it is not plotted."""
+        index = self.index_of(ordinal)
+        if index is None:
+            return False
+        self.hovered = index
+        self.update_annot(index)
+        self.annot.set_visible(True)
+        self.canvas.draw_idle()
+        return True
+
+    def nearest_index(self, event):
+        if event.inaxes is not self.ax or event.xdata is None or not self.ordinals.size:
+            return None
+        target = event.xdata - DATENUM_OFFSET
+        i = int(np.searchsorted(self.ordinals, target))
+        if i == self.ordinals.size or (i > 0 and target - self.ordinals[i - 1] < self.ordinals[i] - target):
+            i -= 1
+        x, y = self.ax.transData.transform((self.ordinals[i] + DATENUM_OFFSET, self.lengths[i]))
+        if (x - event.x) ** 2 + (y - event.y) ** 2 > self.pick_radius ** 2:
+            return None
+        return i
+
+    def on_motion(self, event):
+        index = self.nearest_index(event)
+        if index == self.hovered:
+            return
+        self.hovered = index
+        if index is None:
+            self.annot.set_visible(False)
+        else:
+            self.update_annot(index)
+            self.annot.set_visible(True)
+        self.blit()
+
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        if self.annot.get_visible():
+            self.ax.draw_artist(self.annot)
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def update_annot(self, index):
+        day = date.fromordinal(int(self.ordinals[index]))
+        self.annot.xy = (self.ordinals[index] + DATENUM_OFFSET, self.lengths[index])
+        text = f"Date: {day.isoformat()}\nStreak: {self.lengths[index]}"
+        note = self.notes.get(day)
+        if note:
+            text += f"\nNote: {note}"
+        self.annot.set_text(text)
+
+
+class StreakRenderer:
+    """Owns the streak plot artists and updates them in place.
+
+    The line, the highlight scatters, the legend and the date axis are set
+    up once; ``update`` only swaps data, limits and, when the set of
+    highlighted series changes, the legend.
+
+    Long histories are drawn at the canvas resolution: the line is decimated
+    through a ``MinMaxPyramid`` and the highlight markers are thinned to one
+    per pixel column, and both are redone whenever the view is zoomed,
+    panned or resized.
+
+    A single-day edit goes through ``apply`` with the snapshot's
+    ``StreakDelta``: only the pyramid buckets and markers from the changed
+    days on are redone.
+    """
+
+    def __init__(self, canvas, ax):
+        self.canvas = canvas
+        self.ax = ax
+        self.figure = canvas.figure
+        self.line, = ax.plot([], [], marker='o', linestyle='-', color='#2980B9', markerfacecolor='#85C1E9',
+                             markeredgecolor='#1B4F72', linewidth=2)
+        self.max_scatter = ax.scatter([], [], color='#E74C3C', s=100, label='Highest Streak', zorder=5,
+                                      edgecolors='black')
+        self.break_scatter = ax.scatter([], [], color='#F39C12', s=100, label='Streak Break', zorder=5,
+                                        edgecolors='black', marker='X')
+        self.legend = None
+        self.legend_handles = ()
+        self.limits = None
+        self.xs = np.empty(0)
+        self.lengths = np.empty(0, dtype=np.int64)
+        self.pyramid = MinMaxPyramid(self.lengths)
+        self.peaks = np.empty((0, 2))
+        self.breaks = np.empty((0, 2))
+        ax.callbacks.connect('xlim_changed', self.on_view_changed)
+        canvas.mpl_connect('resize_event', self.on_view_changed)
+
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        self.figure.autofmt_xdate()
+
+        self.hover = HoverController(canvas, ax)
+
+    def update(self, streaks, notes):
+        lengths = streaks.lengths
+        xs = ordinals_to_datenums(streaks.ordinals)
+        self.xs = xs
+        self.lengths = lengths
+        self.pyramid = MinMaxPyramid(lengths)
+        peaks = streaks.max_streak_indices
+        self.peaks = np.column_stack([xs[peaks], lengths[peaks]])
+        self.breaks = np.column_stack([xs[streaks.breaks], np.zeros(streaks.breaks.size)])
+        self._show(streaks, notes)
+
+    def apply(self, streaks, notes, delta):
+        """Show ``streaks`` after the single-day change ``delta`` to what is shown now."""
+        if streaks.ordinals.size != self.xs.size + (1 if delta.added else -1):
+            self.update(streaks, notes)  # Not showing the state before the change
+            return
+        x = delta.day.toordinal() + DATENUM_OFFSET
+        max_streak = int(self.lengths.max()) if self.lengths.size else 0
+        if delta.added:
+            self.xs = np.insert(self.xs, delta.index, x)
+        else:
+            self.xs = np.delete(self.xs, delta.index)
+        self.lengths = streaks.lengths
+        self.pyramid.patch(self.lengths, delta.changed_start)
+
+        # The markers between the changed days, and the day after them, where a
+        # break can appear or go, are redone; the others keep their positions.
+        start, stop = delta.changed_start, min(delta.changed_stop + 1, self.xs.size)
+        x0 = min(x, self.xs[start]) if start < self.xs.size else x
+        x1 = max(x, self.xs[stop - 1]) if stop > start else x
+        if streaks.max_streak < max_streak:
+            # The last longest run got shorter: the new longest can be anywhere
+            peaks = streaks.max_streak_indices
+            self.peaks = np.column_stack([self.xs[peaks], self.lengths[peaks]])
+        else:
+            peaks = start + np.flatnonzero(self.lengths[start:stop] == streaks.max_streak)
+            kept = self.peaks if streaks.max_streak == max_streak else self.peaks[:0]
+            self.peaks = self._splice(kept, x0, x1, np.column_stack([self.xs[peaks], self.lengths[peaks]]))
+        first, last = np.searchsorted(streaks.run_starts, [max(start, 1), stop])
+        breaks = streaks.run_starts[first:last]
+        self.breaks = self._splice(self.breaks, x0, x1, np.column_stack([self.xs[breaks], np.zeros(breaks.size)]))
+        self._show(streaks, notes)
+
+    @staticmethod
+    def _splice(points, x0, x1, replacement):
+        # Points sorted by x, with those in [x0, x1] swapped for `replacement`
+        first = np.searchsorted(points[:, 0], x0, side='left')
+        last = np.searchsorted(points[:, 0], x1, side='right')
+        return np.concatenate([points[:first], replacement, points[last:]])
+
+    def _show(self, streaks, notes):
+        xs = self.xs
+        self.hover.set_data(streaks.ordinals, self.lengths, notes)
+
+        # Moving the view decimates through on_view_changed already
+        if not (xs.size and self._set_limits(xs[0], xs[-1], streaks.max_streak)):
+            self.decimate()
+        handles = ()
+        if xs.size:
+            handles = (self.max_scatter, self.break_scatter) if streaks.breaks.size else (self.max_scatter,)
+        self._set_legend(handles)
+
+        self.canvas.draw_idle()
+
+    def focus(self, ordinal, days=FOCUS_DAYS):
+        """Show ``days`` either side of day ``ordinal`` with its tooltip pinned."""
+        x = ordinal + DATENUM_OFFSET
+        self.limits = None  # The next update shows the whole history again
+        self.ax.set_xlim(x - days, x + days)
+        return self.hover.pin(ordinal)
+
+    def on_view_changed(self, event):
+        if self.xs.size:
+            self.decimate()
+            self.canvas.draw_idle()
+
+    def decimate(self):
+        x0, x1 = self.ax.get_xlim()
+        pixels = max(int(self.ax.bbox.width), 1)
+        start, stop = np.searchsorted(self.xs, [x0, x1])
+        # One point either side keeps the line running off the edges of the view
+        shown = self.pyramid.indices(start - 1, stop + 1, pixels)
+        self.line.set_data(self.xs[shown], self.lengths[shown])
+        for scatter, points in ((self.max_scatter, self.peaks), (self.break_scatter, self.breaks)):
+            scatter.set_offsets(points[thin_to_pixels(points[:, 0], x0, x1, pixels)])
+
+    def _set_limits(self, first, last, max_streak):
+        # Same 5% margins autoscaling would give, one day either side for a single point
+        margin = (last - first) * 0.05 or 1
+        limits = (first - margin, last + margin, max_streak + 1)
+        if limits == self.limits:
+            return False
+        self.limits = limits
+        self.ax.set_ylim(0, limits[2])
+        self.ax.set_xlim(limits[0], limits[1])
+        return True
+
+    def _set_legend(self, handles):
+        if handles == self.legend_handles:
+            return
+        self.legend_handles = handles
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
+        if handles:
+            self.legend = self.ax.legend(handles=list(handles))
+
+
+# Calendar cells: one band of Monday-to-Sunday rows per year, plus a spacer
+# row, and one column per Monday-aligned week (a year touches up to 54).
+CALENDAR_ROWS = 8
+CALENDAR_WEEKS = 54
+# Cell values: padding outside any year, a day without an entry, then
+# recorded days shaded by the length of their streak so far.
+CALENDAR_COLORS = ('#FFFFFF00', '#EBEDF0', '#9BE9A8', '#40C463', '#30A14E', '#216E39')
+CALENDAR_LEVELS = (7, 30, 100)  # Streak lengths where the shade steps up
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def ordinal_years(ordinals):
+    days = np.asarray(ordinals, dtype=np.int64) - _EPOCH.toordinal()
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + _EPOCH.year
+
+
+class CalendarGrid:
+    """A module's days packed into a ``uint8`` image, GitHub calendar style.
+
+    Building is a handful of NumPy scatters over the years spanned, so the
+    image, not the number of entries, sets the cost. ``cell`` and ``day``
+    convert between day ordinals and (row, column) by arithmetic alone.
+    """
+
+    def __init__(self, ordinals, lengths):
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        self.first_year = int(ordinal_years(ordinals[:1])[0]) if ordinals.size else date.today().year
+        last_year = int(ordinal_years(ordinals[-1:])[0]) if ordinals.size else self.first_year
+        self.years = last_year - self.first_year + 1
+        jan_firsts = np.array([date(year, 1, 1).toordinal() for year in range(self.first_year, last_year + 2)])
+        # date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is the weekday
+        self.week_starts = jan_firsts[:-1] - (jan_firsts[:-1] - 1) % 7
+        self.first_day = int(jan_firsts[0])
+        self.last_day = int(jan_firsts[-1]) - 1
+        self.values = np.zeros((self.years * CALENDAR_ROWS, CALENDAR_WEEKS), dtype=np.uint8)
+        self.lengths = np.zeros(self.values.shape, dtype=np.int32)
+
+        every_day = np.arange(jan_firsts[0], jan_firsts[-1])
+        self.values[self.cell(every_day)] = 1
+        cells = self.cell(ordinals)
+        self.values[cells] = 2 + np.searchsorted(CALENDAR_LEVELS, lengths, side='right')
+        self.lengths[cells] = lengths
+
+    def cell(self, ordinals):
+        """(rows, columns) of day ordinals, for fancy indexing."""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        year = ordinal_years(ordinals) - self.first_year
+        return year * CALENDAR_ROWS + (ordinals - 1) % 7, (ordinals - self.week_starts[year]) // 7
+
+    def day(self, row, column):
+        """Ordinal of the day in a cell, or None for padding and spacers."""
+        year, weekday = divmod(row, CALENDAR_ROWS)
+        if not (0 <= year < self.years and weekday < 7 and 0 <= column < CALENDAR_WEEKS):
+            return None
+        if not self.values[row, column]:
+            return None
+        return int(self.week_starts[year]) + column * 7 + weekday
+
+
+class CalendarHover(HoverController):
+    """Tooltip for the calendar: the cell under the mouse is found by arithmetic."""
+
+    def __init__(self, canvas, ax):
+        super().__init__(canvas, ax)
+        self.grid = None
+
+    def set_grid(self, grid, notes):
+        self.set_data(self.ordinals, self.lengths, notes)
+        self.grid = grid
+
+    def index_of(self, ordinal):
+        if self.grid is None or not self.grid.first_day <= ordinal <= self.grid.last_day:
+            return None
+        return ordinal
+
+    def nearest_index(self, event):
+        if event.inaxes is not self.ax or event.xdata is None or self.grid is None:
+            return None
+        return self.grid.day(int(round(event.ydata)), int(round(event.xdata)))
+
+    def update_annot(self, ordinal):
+        row, column = self.grid.cell([ordinal])
+        self.annot.xy = (column[0], row[0])
+        day = date.fromordinal(ordinal)
+        length = self.grid.lengths[row[0], column[0]]
+        text = f"Date: {day.isoformat()}\n" + (f"Streak: {length}" if length else "Not recorded")
+        note = self.notes.get(day)
+        if note:
+            text += f"\nNote: {note}"
+        self.annot.set_text(text)
+
+
+class CalendarRenderer:
+    """Calendar heatmap of a module, drawn as one image on its own axes.
+
+    The axes share the figure with the streak line and only one of the two
+    is visible at a time; see ``set_visible``.
+    """
+
+    def __init__(self, canvas):
+        from matplotlib.colors import ListedColormap, NoNorm
+
+        self.canvas = canvas
+        self.ax = canvas.figure.add_subplot(111, label='calendar')
+        self.ax.set_title("Streak Calendar", color="#2E4053", fontsize=14, fontweight='bold')
+        self.ax.grid(False)
+        self.ax.set_facecolor('white')
+        for spine in self.ax.spines.values():
+            spine.set_visible(False)
+        self.ax.tick_params(length=0, colors='#34495E')
+        self.ax.set_xticks([(date(2001, month, 1).timetuple().tm_yday + 3) / 7 for month in range(1, 13)])
+        self.ax.set_xticklabels(MONTHS)
+        self.image = self.ax.imshow(np.zeros((CALENDAR_ROWS, CALENDAR_WEEKS), dtype=np.uint8),
+                                    cmap=ListedColormap(CALENDAR_COLORS), norm=NoNorm(),
+                                    interpolation='nearest', aspect='auto')
+        self.years = None
+        self.hover = CalendarHover(canvas, self.ax)
+
+    def set_visible(self, visible):
+        self.ax.set_visible(visible)
+
+    def focus(self, ordinal):
+        """Pin the tooltip of day ``ordinal``; every year is on screen already."""
+        return self.hover.pin(ordinal)
+
+    def apply(self, streaks, notes, delta):
+        # The grid costs the size of the image, not of the history, so it is simply rebuilt
+        self.update(streaks, notes)
+
+    def update(self, streaks, notes):
+        grid = CalendarGrid(streaks.ordinals, streaks.lengths)
+        self.image.set_data(grid.values)
+        rows = grid.values.shape[0]
+        self.image.set_extent((-0.5, CALENDAR_WEEKS - 0.5, rows - 0.5, -0.5))
+        self.ax.set_xlim(-0.5, CALENDAR_WEEKS - 0.5)
+        self.ax.set_ylim(rows - 0.5, -0.5)
+        years = (grid.first_year, grid.years)
+        if years != self.years:
+            self.years = years
+            step = -(-grid.years // 16)  # At most 16 year labels
+            self.ax.set_yticks([year * CALENDAR_ROWS + 3 for year in range(0, grid.years, step)])
+            self.ax.set_yticklabels([str(grid.first_year + year) for year in range(0, grid.years, step)])
+        self.hover.set_grid(grid, notes)
+        self.canvas.draw_idle()
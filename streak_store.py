@@ -0,0 +1,857 @@
+"""SQLite storage for modules, streak runs and notes.
+
+Streak days are stored run-length encoded: each contiguous run of days is a
+single ``streak_runs`` row holding its inclusive ``start_date``/``end_date``.
+Runs of one module never overlap or touch; adding and deleting days splits
+and merges them. Notes are rare, so they live in the sparse ``streak_notes``
+side table keyed by date.
+
+``module_stats`` caches each module's run count, day count, longest run and
+last run with a version counter. Triggers on ``streak_runs`` keep it up to
+date for every writer, so summaries are read in O(1) per module instead of
+scanning history; ``check_stats`` verifies it against the runs.
+
+``notes_fts`` is an FTS5 index over the notes and their lengths. It stores
+no copy of their text and is kept in sync by triggers on ``streak_notes``,
+so every path that writes notes (upserts, range deletes, module deletes,
+imports) updates it; ``search_notes`` queries it.
+
+Dates are stored as INTEGER day numbers, the same proleptic Gregorian
+ordinals ``streak_engine`` works with, so reads go straight into NumPy
+arrays and range arithmetic is plain integer arithmetic. Text is only
+produced at the display edge.
+"""
+import re
+import sqlite3
+import unicodedata
+from datetime import date
+from itertools import chain
+
+# NumPy and streak_engine are imported inside the readers that use them, so
+# write-only tools such as streak_cli start without paying for NumPy.
+
+# julianday() of 0001-01-01 is 1721425.5 and its ordinal is 1.
+SQL_DAY_NUMBER = "CAST(julianday({}) - 1721424.5 AS INTEGER)"
+
+# Per-module ordered reads run on every module switch; the (module_id, ...)
+# covering indexes created in create_tables keep them index-only.
+RUNS_BY_MODULE_SQL = "SELECT start_date, end_date FROM streak_runs WHERE module_id = ? ORDER BY start_date"
+NOTES_BY_MODULE_SQL = "SELECT date, note FROM streak_notes WHERE module_id = ? ORDER BY date"
+# Dashboard: every module's cached stats, one primary key lookup per module.
+MODULE_SUMMARY_SQL = ("SELECT modules.id, IFNULL(run_count, 0), IFNULL(max_streak, 0), IFNULL(last_start, 0), "
+                      "IFNULL(last_end, 0), modules.name "
+                      "FROM modules LEFT JOIN module_stats ON module_stats.module_id = modules.id "
+                      "WHERE modules.id NOT IN (SELECT module_id FROM pending_deletes)")
+STATS_COLUMNS = ("run_count", "day_count", "max_streak", "max_count", "last_start", "last_end")
+# The same stats computed from the runs themselves. Runs never overlap, so
+# the last run is the one with both the greatest start and end.
+RUN_STATS_SQL = ("SELECT module_id, COUNT(*), SUM(end_date - start_date + 1), MAX(end_date - start_date + 1), "
+                 "0, MAX(start_date), MAX(end_date) FROM streak_runs GROUP BY module_id")
+# Runs overlapping [first, last] start at most max_streak - 1 days before it,
+# which bounds an index range seek per module. CROSS JOIN keeps module_stats
+# as the outer loop.
+RECENT_RUNS_SQL = ("SELECT streak_runs.module_id, start_date, end_date FROM module_stats CROSS JOIN streak_runs "
+                   "ON streak_runs.module_id = module_stats.module_id "
+                   "AND start_date BETWEEN :first - max_streak + 1 AND :last WHERE end_date >= :first")
+NOTE_UPSERT_SQL = ("INSERT INTO streak_notes (date, module_id, note) VALUES (?, ?, ?) "
+                   "ON CONFLICT(date, module_id) DO UPDATE SET note = excluded.note")
+RUNS_IN_SPAN_SQL = ("SELECT id, start_date, end_date FROM streak_runs "
+                    "WHERE module_id = ? AND start_date <= ? AND end_date >= ?")
+# user_version once orphaned rows left by the unenforced foreign keys of
+# older versions have been deleted
+SCHEMA_VERSION = 1
+NOTE_SEARCH_LIMIT = 100  # Hits returned by search_notes
+NOTE_PREFIXES = (2, 3, 4, 5, 6)  # Word prefix lengths notes_fts keeps an index for
+NOTE_LENGTH_CAP = 64  # Notes at least this long share one length token in notes_fts
+NOTE_SORT_LIMIT = 4_096  # Up to this many matches are sorted at once instead of searched length by length
+NOTE_COUNT_SQL = "SELECT COUNT(*) FROM (SELECT 1 FROM notes_fts WHERE notes_fts MATCH ? LIMIT ?)"
+# Matches whose folded words are also LIKE ?2 (unless it is NULL), newest
+# first. Within one length token that is best first, and FTS5 reads its
+# id-ordered lists backwards and stops at the limit; the capped token also
+# needs its notes sorted by length.
+NOTE_SEARCH_SQL = ("SELECT streak_notes.module_id, modules.name, streak_notes.date, streak_notes.note "
+                   "FROM notes_fts JOIN streak_notes ON streak_notes.id = notes_fts.rowid "
+                   "JOIN modules ON modules.id = streak_notes.module_id "
+                   "WHERE notes_fts MATCH ?1 AND (?2 IS NULL OR fold_words(streak_notes.note) LIKE ?2 ESCAPE '\\') "
+                   "ORDER BY {}notes_fts.rowid DESC LIMIT ?3")
+# Runs of what unicode61 treats as separators: anything but letters and digits
+WORD_SEPARATORS = re.compile(r"[\W_]+")
+BUSY_TIMEOUT = 10.0  # Seconds a connection waits for another process's write lock
+DELETE_CHUNK = 5_000  # Rows per statement when deleting a module or orphans
+VACUUM_STEP = 2_000  # Free pages returned to the file system per vacuum_step
+
+
+def connect(path, cached_statements=512):
+    """Open ``path`` with the connection profile every tool should share.
+
+    WAL lets readers (reporting jobs, other app instances) run alongside a
+    writer, and with WAL ``synchronous=NORMAL`` only syncs at checkpoints
+    instead of on every commit. Foreign keys are enforced, so deleting a
+    module cascades to its runs, notes and stats. New databases are created
+    with incremental auto-vacuum (see ``vacuum``); the pragma has to come
+    before WAL, which writes the file header.
+
+    Several processes may share the file: a busy connection waits up to
+    ``BUSY_TIMEOUT`` for the write lock instead of failing at once.
+    ``search_notes`` needs the ``fold_words`` SQL function registered here.
+    """
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, cached_statements=cached_statements)
+    conn.create_function("fold_words", 1, fold_words, deterministic=True)
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-16384")  # 16 MiB
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def writes(func):
+    """Mark a helper that writes, so a ``DatabaseWorker`` takes the write lock before running it."""
+    func.writes = True
+    return func
+
+
+def encode_date(d):
+    return d.toordinal()
+
+
+def decode_date(value):
+    return date.fromordinal(value)
+
+
+@writes
+def create_tables(conn):
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS modules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    ''')
+    if cursor.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        # Before the migrations below copy orphans into tables that enforce foreign keys
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='module_stats'")
+        if cursor.fetchone() is not None:
+            _create_stats_triggers(cursor)
+        delete_orphans(conn)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='streak_runs'")
+    if cursor.fetchone() is None:
+        _create_run_tables(cursor)
+        # Check if a one-row-per-date streaks table from an older version exists
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='streaks'")
+        if cursor.fetchone() is not None:
+            cursor.execute("PRAGMA table_info(streaks)")
+            columns = [info[1] for info in cursor.fetchall()]
+            if 'module_id' not in columns:
+                _migrate_streaks_table(cursor)
+            elif 'note' not in columns:
+                cursor.execute("ALTER TABLE streaks ADD COLUMN note TEXT")
+            _migrate_streaks_to_runs(cursor)
+        conn.commit()
+    else:
+        # Check if the run tables still hold ISO date strings from an older version
+        cursor.execute("PRAGMA table_info(streak_runs)")
+        if {info[1]: info[2] for info in cursor.fetchall()}['start_date'] != 'INTEGER':
+            _migrate_text_dates(cursor)
+            conn.commit()
+    _create_indexes(cursor)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pending_deletes (
+            module_id INTEGER PRIMARY KEY,
+            FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='notes_fts'")
+    if cursor.fetchone() is not None and "note_length" not in {info[1] for info in
+                                                               cursor.execute("PRAGMA table_info(notes_fts)")}:
+        # Indexed before note lengths were, so it cannot rank without reading every match
+        cursor.execute("DROP TABLE notes_fts")
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='notes_fts'")
+    if cursor.fetchone() is None:
+        try:
+            _create_notes_index(cursor)
+        except sqlite3.OperationalError:
+            pass  # SQLite was built without FTS5; search_notes scans the notes instead
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='module_stats'")
+    if cursor.fetchone() is None:
+        _create_stats_table(cursor)
+        _create_stats_triggers(cursor)
+        rebuild_stats(conn)
+    else:
+        # Replace triggers whose INSERT OR IGNORE broke note upserts
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name LIKE '%_stats' AND sql LIKE '%INSERT OR IGNORE%'")
+        if cursor.fetchone() is not None:
+            _create_stats_triggers(cursor)
+    conn.commit()
+    # Chunked deletes cut short by the app closing are finished here
+    for (module_id,) in cursor.execute("SELECT module_id FROM pending_deletes").fetchall():
+        while not delete_module_chunk(conn, module_id):
+            conn.commit()
+        conn.commit()
+
+
+def _create_streaks_table(cursor):
+    cursor.execute('''
+        CREATE TABLE streaks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            module_id INTEGER NOT NULL,
+            note TEXT,
+            UNIQUE(date, module_id),
+            FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+        )
+    ''')
+
+
+def _create_run_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE streak_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER NOT NULL,
+            start_date INTEGER NOT NULL,
+            end_date INTEGER NOT NULL,
+            UNIQUE(module_id, start_date),
+            FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE streak_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            note TEXT NOT NULL,
+            UNIQUE(date, module_id),
+            FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+        )
+    ''')
+
+
+def _create_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_streak_runs_module ON streak_runs (module_id, start_date, end_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_streak_notes_module ON streak_notes (module_id, date, note)")
+
+
+def _note_length_token(note):
+    # SQL for the notes_fts token of a note's length, e.g. 'l12'
+    return f"'l' || MIN(length({note}), {NOTE_LENGTH_CAP})"
+
+
+def _create_notes_index(cursor):
+    # External content: the index points at streak_notes rows by id, and
+    # the view adds each note's length as a token so search_notes can read
+    # the shortest matches first. The prefix indexes keep
+    # search-as-you-type prefixes from scanning the whole vocabulary.
+    for name in ("streak_notes_insert_fts", "streak_notes_delete_fts", "streak_notes_update_fts"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute("DROP VIEW IF EXISTS notes_fts_content")
+    cursor.execute(f"CREATE VIEW notes_fts_content AS SELECT id, note, {_note_length_token('note')} AS note_length "
+                   f"FROM streak_notes")
+    prefixes = " ".join(map(str, NOTE_PREFIXES))
+    cursor.execute(f"CREATE VIRTUAL TABLE notes_fts USING fts5(note, note_length, content='notes_fts_content', "
+                   f"content_rowid='id', prefix='{prefixes}')")
+    cursor.execute(f'''
+        CREATE TRIGGER streak_notes_insert_fts AFTER INSERT ON streak_notes
+        BEGIN
+            INSERT INTO notes_fts (rowid, note, note_length) VALUES (new.id, new.note, {_note_length_token('new.note')});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER streak_notes_delete_fts AFTER DELETE ON streak_notes
+        BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, note, note_length)
+            VALUES ('delete', old.id, old.note, {_note_length_token('old.note')});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER streak_notes_update_fts AFTER UPDATE OF note ON streak_notes WHEN old.note IS NOT new.note
+        BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, note, note_length)
+            VALUES ('delete', old.id, old.note, {_note_length_token('old.note')});
+            INSERT INTO notes_fts (rowid, note, note_length) VALUES (new.id, new.note, {_note_length_token('new.note')});
+        END
+    ''')
+    cursor.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+
+
+def _create_stats_table(cursor):
+    # max_count is how many runs have length max_streak, so deleting one of
+    # several longest runs does not have to rescan the module.
+    cursor.execute('''
+        CREATE TABLE module_stats (
+            module_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            run_count INTEGER NOT NULL DEFAULT 0,
+            day_count INTEGER NOT NULL DEFAULT 0,
+            max_streak INTEGER NOT NULL DEFAULT 0,
+            max_count INTEGER NOT NULL DEFAULT 0,
+            last_start INTEGER NOT NULL DEFAULT 0,
+            last_end INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+        )
+    ''')
+
+
+STATS_TRIGGERS = (
+    "streak_runs_insert_stats", "streak_runs_delete_stats", "streak_notes_insert_stats",
+    "streak_notes_update_stats", "streak_notes_delete_stats", "modules_delete_stats",
+)
+
+
+def _create_stats_triggers(cursor):
+    for name in STATS_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    # Runs are only ever inserted and deleted, never updated in place.
+    cursor.execute('''
+        CREATE TRIGGER streak_runs_insert_stats AFTER INSERT ON streak_runs
+        BEGIN
+            INSERT INTO module_stats (module_id) SELECT new.module_id
+            WHERE NOT EXISTS (SELECT 1 FROM module_stats WHERE module_id = new.module_id);
+            UPDATE module_stats SET
+                version = version + 1,
+                run_count = run_count + 1,
+                day_count = day_count + new.end_date - new.start_date + 1,
+                max_streak = MAX(max_streak, new.end_date - new.start_date + 1),
+                max_count = CASE
+                    WHEN new.end_date - new.start_date + 1 > max_streak THEN 1
+                    WHEN new.end_date - new.start_date + 1 = max_streak THEN max_count + 1
+                    ELSE max_count END,
+                last_start = MAX(last_start, new.start_date),
+                last_end = CASE WHEN new.start_date > last_start THEN new.end_date ELSE last_end END
+            WHERE module_id = new.module_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER streak_runs_delete_stats AFTER DELETE ON streak_runs
+        BEGIN
+            UPDATE module_stats SET
+                version = version + 1,
+                run_count = run_count - 1,
+                day_count = day_count - (old.end_date - old.start_date + 1),
+                max_count = max_count - (old.end_date - old.start_date + 1 = max_streak),
+                last_start = CASE WHEN old.start_date < last_start THEN last_start ELSE
+                    IFNULL((SELECT MAX(start_date) FROM streak_runs WHERE module_id = old.module_id), 0) END,
+                last_end = CASE WHEN old.start_date < last_start THEN last_end ELSE
+                    IFNULL((SELECT end_date FROM streak_runs WHERE module_id = old.module_id
+                            ORDER BY start_date DESC LIMIT 1), 0) END
+            WHERE module_id = old.module_id;
+            -- The last longest run is gone: rescan for the new longest
+            UPDATE module_stats SET
+                max_streak = (SELECT IFNULL(MAX(end_date - start_date + 1), 0) FROM streak_runs
+                              WHERE module_id = old.module_id)
+            WHERE module_id = old.module_id AND max_count = 0;
+            UPDATE module_stats SET
+                max_count = (SELECT COUNT(*) FROM streak_runs
+                             WHERE module_id = old.module_id AND end_date - start_date + 1 = module_stats.max_streak)
+            WHERE module_id = old.module_id AND max_count = 0;
+        END
+    ''')
+    # Notes are part of a loaded module too, so editing them moves its version on.
+    # INSERT OR IGNORE would take on the conflict policy of a note upsert, hence NOT EXISTS.
+    # Deleting a note never creates the row, so orphaned notes can be deleted
+    # while foreign keys are enforced.
+    for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+        create_row = f'''
+                INSERT INTO module_stats (module_id) SELECT {row}.module_id
+                WHERE NOT EXISTS (SELECT 1 FROM module_stats WHERE module_id = {row}.module_id);'''
+        cursor.execute(f'''
+            CREATE TRIGGER streak_notes_{event.lower()}_stats AFTER {event} ON streak_notes
+            BEGIN{create_row if event != "DELETE" else ""}
+                UPDATE module_stats SET version = version + 1 WHERE module_id = {row}.module_id;
+            END
+        ''')
+    cursor.execute('''
+        CREATE TRIGGER modules_delete_stats AFTER DELETE ON modules
+        BEGIN
+            DELETE FROM module_stats WHERE module_id = old.id;
+        END
+    ''')
+
+
+def _migrate_streaks_table(cursor):
+    cursor.execute("ALTER TABLE streaks RENAME TO streaks_old")
+    _create_streaks_table(cursor)
+    cursor.execute("SELECT id FROM modules WHERE id=1")
+    if cursor.fetchone() is None:
+        cursor.execute("INSERT INTO modules (id, name) VALUES (1, 'default')")
+    cursor.execute("INSERT INTO streaks (id, date, module_id, note) SELECT id, date, 1, NULL FROM streaks_old")
+    cursor.execute("DROP TABLE streaks_old")
+
+
+def _migrate_streaks_to_runs(cursor):
+    # Gaps and islands: within a run, day - row_number is constant.
+    cursor.execute(f'''
+        INSERT INTO streak_runs (module_id, start_date, end_date)
+        SELECT module_id, MIN(day), MAX(day)
+        FROM (
+            SELECT module_id, day, day - ROW_NUMBER() OVER (PARTITION BY module_id ORDER BY day) AS island
+            FROM (SELECT module_id, {SQL_DAY_NUMBER.format('date')} AS day FROM streaks)
+        )
+        GROUP BY module_id, island
+    ''')
+    cursor.execute(f'''
+        INSERT INTO streak_notes (date, module_id, note)
+        SELECT {SQL_DAY_NUMBER.format('date')}, module_id, note FROM streaks WHERE note IS NOT NULL AND note != ''
+    ''')
+    cursor.execute("DROP TABLE streaks")
+
+
+def _migrate_text_dates(cursor):
+    # Indexes keep their names when a table is renamed, so drop them here and
+    # let _create_indexes build them on the new tables.
+    cursor.execute("DROP INDEX IF EXISTS idx_streak_runs_module")
+    cursor.execute("DROP INDEX IF EXISTS idx_streak_notes_module")
+    cursor.execute("ALTER TABLE streak_runs RENAME TO streak_runs_old")
+    cursor.execute("ALTER TABLE streak_notes RENAME TO streak_notes_old")
+    _create_run_tables(cursor)
+    cursor.execute(f'''
+        INSERT INTO streak_runs (id, module_id, start_date, end_date)
+        SELECT id, module_id, {SQL_DAY_NUMBER.format('start_date')}, {SQL_DAY_NUMBER.format('end_date')}
+        FROM streak_runs_old
+    ''')
+    cursor.execute(f'''
+        INSERT INTO streak_notes (id, date, module_id, note)
+        SELECT id, {SQL_DAY_NUMBER.format('date')}, module_id, note FROM streak_notes_old
+    ''')
+    cursor.execute("DROP TABLE streak_runs_old")
+    cursor.execute("DROP TABLE streak_notes_old")
+
+
+def load_runs(conn, module_id):
+    """Inclusive run bounds of one module as two int64 day-number arrays."""
+    import numpy as np
+
+    flat = np.fromiter(chain.from_iterable(conn.execute(RUNS_BY_MODULE_SQL, (module_id,))), dtype=np.int64)
+    return flat[0::2], flat[1::2]
+
+
+def load_version(conn, module_id):
+    row = conn.execute("SELECT version FROM module_stats WHERE module_id = ?", (module_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def load_snapshot(conn, module_id, version=None):
+    """Load one module, or return None if its version still equals ``version``."""
+    from streak_engine import ModuleSnapshot
+
+    current = load_version(conn, module_id)
+    if current == version:
+        return None
+    run_starts, run_ends = load_runs(conn, module_id)
+    notes = {decode_date(day): note for day, note in conn.execute(NOTES_BY_MODULE_SQL, (module_id,))}
+    return ModuleSnapshot(module_id, run_starts, run_ends, notes, current)
+
+
+def poll_changes(conn, data_version=None):
+    """What other connections changed since ``PRAGMA data_version`` was ``data_version``.
+
+    Returns None when nobody else has committed, which costs a single
+    pragma. Otherwise returns ``(data_version, versions, modules)``, where
+    ``versions`` maps module ids to their ``module_stats`` version and
+    ``modules`` is ``load_modules``; comparing them with the previous poll
+    tells which modules moved on.
+    """
+    current = conn.execute("PRAGMA data_version").fetchone()[0]
+    if current == data_version:
+        return None
+    return current, load_versions(conn), load_modules(conn)
+
+
+def load_versions(conn):
+    """``module_stats`` version of every module that has one, by module id."""
+    return dict(conn.execute("SELECT module_id, version FROM module_stats"))
+
+
+def _run_stats(conn):
+    # Recomputed stats per module with max_count filled in.
+    stats = {row[0]: list(row[1:]) for row in conn.execute(RUN_STATS_SQL)}
+    counts = conn.execute("SELECT module_id, end_date - start_date + 1 AS length, COUNT(*) FROM streak_runs "
+                          "GROUP BY module_id, length")
+    for module_id, length, count in counts:
+        if length == stats[module_id][2]:
+            stats[module_id][3] = count
+    return {module_id: tuple(values) for module_id, values in stats.items()}
+
+
+@writes
+def rebuild_stats(conn):
+    """Recompute ``module_stats`` from the runs. Versions keep counting up."""
+    cursor = conn.cursor()
+    stats = _run_stats(conn)
+    cursor.execute(f"UPDATE module_stats SET version = version + 1, "
+                   f"{', '.join(f'{column} = 0' for column in STATS_COLUMNS)}")
+    cursor.executemany("INSERT OR IGNORE INTO module_stats (module_id) VALUES (?)", [(m,) for m in stats])
+    cursor.executemany(f"UPDATE module_stats SET {', '.join(f'{column} = ?' for column in STATS_COLUMNS)} "
+                       f"WHERE module_id = ?", [values + (module_id,) for module_id, values in stats.items()])
+
+
+def check_stats(conn):
+    """Compare ``module_stats`` with the runs.
+
+    Returns ``(module_id, cached, actual)`` for every module whose cached
+    stats are wrong; both are dicts keyed by ``STATS_COLUMNS``.
+    """
+    empty = (0,) * len(STATS_COLUMNS)
+    cached = {row[0]: row[1:] for row in conn.execute(f"SELECT module_id, {', '.join(STATS_COLUMNS)} FROM module_stats")}
+    actual = _run_stats(conn)
+    return [(module_id, dict(zip(STATS_COLUMNS, cached.get(module_id, empty))),
+             dict(zip(STATS_COLUMNS, actual.get(module_id, empty))))
+            for module_id in sorted(cached.keys() | actual.keys())
+            if cached.get(module_id, empty) != actual.get(module_id, empty)]
+
+
+def load_summaries(conn, today=None, days=90):
+    """Max streak, breaks, current streak and the last ``days`` of streak
+    lengths for every module."""
+    import numpy as np
+
+    from streak_engine import ModuleSummaries, recent_streaks
+
+    today = encode_date(today or date.today())
+    rows = conn.execute(MODULE_SUMMARY_SQL).fetchall()
+    names = [row[5] for row in rows]
+    stats = np.array([row[:5] for row in rows], dtype=np.int64).reshape(-1, 5)
+    module_ids, run_counts, max_streaks, last_starts, last_ends = stats.T
+    current_streaks = np.where(last_ends >= today - 1, last_ends - last_starts + 1, 0)
+
+    window = {"first": today - days + 1, "last": today}
+    runs = np.fromiter(chain.from_iterable(conn.execute(RECENT_RUNS_SQL, window)), dtype=np.int64).reshape(-1, 3)
+    recent = recent_streaks(module_ids, runs[:, 0], runs[:, 1], runs[:, 2], today, days)
+    return ModuleSummaries(module_ids, names, max_streaks, np.maximum(run_counts - 1, 0), current_streaks, recent)
+
+
+def note_query(text, prefix=True):
+    """FTS5 query for notes holding every word of ``text``, the last one as a prefix.
+
+    Words are quoted, so punctuation and FTS5 keywords typed by the user
+    are searched for rather than parsed, and only the note column is
+    searched, not the length tokens. Returns None for blank text.
+    """
+    words = text.split()
+    if not words:
+        return None
+    return "{note} : (" + " ".join('"' + word.replace('"', '""') + '"' for word in words) + ("*" if prefix else "") + ")"
+
+
+def has_notes_index(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='notes_fts'").fetchone() is not None
+
+
+def fold_words(text):
+    """``text`` split into words the way notes_fts's unicode61 tokenizer does it.
+
+    Letters are case folded and lose their diacritics, and every word is
+    followed and preceded by a space, so LIKE can match at word starts.
+    """
+    if text is None:
+        return None
+    letters = "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+    return " " + " ".join(WORD_SEPARATORS.sub(" ", letters.casefold()).split()) + " "
+
+
+def like_pattern(word, prefix=False):
+    """A LIKE pattern, with ``ESCAPE '\\'``, for ``fold_words`` text holding ``word``.
+
+    The words of ``word`` must be whole words of the text, in order, and the
+    last one may just start one if ``prefix``.
+    """
+    escaped = fold_words(word).strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "% " + escaped + ("%" if prefix else " %")
+
+
+def _search_lengths(conn, query, pattern, limit):
+    if conn.execute(NOTE_COUNT_SQL, (query, NOTE_SORT_LIMIT + 1)).fetchone()[0] <= NOTE_SORT_LIMIT:
+        return conn.execute(NOTE_SEARCH_SQL.format("length(streak_notes.note), "), (query, pattern, limit)).fetchall()
+    hits = []
+    for length in range(1, NOTE_LENGTH_CAP + 1):
+        order = "length(streak_notes.note), " if length == NOTE_LENGTH_CAP else ""
+        hits += conn.execute(NOTE_SEARCH_SQL.format(order),
+                             (f"{query} AND note_length : l{length}", pattern, limit - len(hits))).fetchall()
+        if len(hits) >= limit:
+            break
+    return hits
+
+
+def search_notes(conn, text, limit=NOTE_SEARCH_LIMIT):
+    """Notes of every module matching ``text``, best match first.
+
+    Returns up to ``limit`` ``(module_id, module_name, day, note)`` tuples,
+    ``day`` being a day number. Every hit holds every word, so BM25's
+    inverse document frequencies are the same for all of them, and notes
+    are too short to repeat a word: what is left of BM25 is that shorter
+    notes match better, ties going to the newest. Hits are ranked by that
+    over every matching note. FTS5's own bm25() would count every note
+    holding each word first, and sorting all matches by length reads every
+    one of them, both hundreds of ms for a common word in a million
+    notes. Instead the index holds each note's length as a token, and
+    lengths are searched shortest first until ``limit`` hits are found, so
+    a common word stops after a few short lengths. Words in at most
+    ``NOTE_SORT_LIMIT`` notes are cheaper to sort at once.
+
+    The last word also matches as a prefix, so results follow typing.
+    Prefixes outside ``NOTE_PREFIXES`` would merge the notes of every word
+    they start: a shorter one only matches itself, and of a longer one only
+    the indexed part goes to the index and LIKE checks the rest against
+    the note's words as the index folds them (see ``fold_words``).
+
+    Without the index every note's folded words are scanned with LIKE,
+    matching and ranked the same way.
+    """
+    words = text.split()
+    if not words:
+        return []
+    if has_notes_index(conn):
+        last = words[-1]
+        indexed = " ".join(words[:-1] + [last[:NOTE_PREFIXES[-1]]])
+        return _search_lengths(conn, note_query(indexed, prefix=len(last) >= NOTE_PREFIXES[0]),
+                               like_pattern(last, prefix=True) if len(last) > NOTE_PREFIXES[-1] else None, limit)
+    where = " AND ".join(["fold_words(note) LIKE ? ESCAPE '\\'"] * len(words))
+    patterns = [like_pattern(word) for word in words[:-1]]
+    patterns.append(like_pattern(words[-1], prefix=len(words[-1]) >= NOTE_PREFIXES[0]))
+    return conn.execute(f"SELECT module_id, modules.name, date, note FROM streak_notes "
+                        f"JOIN modules ON modules.id = module_id WHERE {where} "
+                        f"ORDER BY length(note), streak_notes.id DESC LIMIT ?", patterns + [limit]).fetchall()
+
+
+def check_notes_index(conn):
+    """Raise ``sqlite3.DatabaseError`` if ``notes_fts`` disagrees with the notes."""
+    conn.execute("INSERT INTO notes_fts (notes_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def has_date(cursor, module_id, day):
+    value = encode_date(day)
+    cursor.execute("SELECT 1 FROM streak_runs WHERE module_id = ? AND start_date <= ? AND end_date >= ?",
+                   (module_id, value, value))
+    return cursor.fetchone() is not None
+
+
+# Below, spans are (start, end) pairs of inclusive day numbers.
+
+def _touching_runs(cursor, module_id, start, end):
+    # Runs overlapping [start, end] or adjacent to either end of it.
+    cursor.execute(RUNS_IN_SPAN_SQL, (module_id, end + 1, start - 1))
+    return cursor.fetchall()
+
+
+def _merge_spans(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _span_days(spans):
+    return sum(end - start + 1 for start, end in spans)
+
+
+def _add_spans(cursor, module_id, spans):
+    # One read of every run the new spans can touch, then only the runs that
+    # actually changed are deleted and re-inserted.
+    existing = _touching_runs(cursor, module_id, min(s[0] for s in spans), max(s[1] for s in spans))
+    existing_spans = [(run_start, run_end) for _, run_start, run_end in existing]
+    merged = _merge_spans(list(spans) + existing_spans)
+    kept = set(existing_spans) & set(merged)
+    cursor.executemany("DELETE FROM streak_runs WHERE id = ?",
+                       [(run_id,) for run_id, run_start, run_end in existing if (run_start, run_end) not in kept])
+    cursor.executemany("INSERT INTO streak_runs (module_id, start_date, end_date) VALUES (?, ?, ?)",
+                       [(module_id, start, end) for start, end in merged if (start, end) not in kept])
+    return _span_days(merged) - _span_days(existing_spans)
+
+
+def add_range(cursor, module_id, start, end):
+    """Record every day in [start, end]; returns the number of new days."""
+    return _add_spans(cursor, module_id, [(encode_date(start), encode_date(end))])
+
+
+@writes
+def add_ranges(conn, ranges):
+    """Bulk-record ``(module_id, start, end)`` ranges.
+
+    Ranges may overlap each other and existing runs. Returns the number of
+    days that were not already recorded. Like the other connection-level
+    helpers it does not commit, so a whole batch lands in one transaction.
+    """
+    return add_spans(conn, [(module_id, encode_date(start), encode_date(end)) for module_id, start, end in ranges])
+
+
+@writes
+def add_spans(conn, spans):
+    """``add_ranges`` for ``(module_id, start, end)`` spans of day numbers."""
+    by_module = {}
+    for module_id, start, end in spans:
+        if end < start:
+            raise ValueError(f"range end {decode_date(end)} is before start {decode_date(start)}")
+        by_module.setdefault(module_id, []).append((start, end))
+    added = 0
+    cursor = conn.cursor()
+    for module_id, module_spans in by_module.items():
+        added += _add_spans(cursor, module_id, module_spans)
+    return added
+
+
+def add_date(cursor, module_id, day):
+    return add_range(cursor, module_id, day, day)
+
+
+def delete_range(cursor, module_id, start, end):
+    """Remove every day in [start, end] and its notes; returns days removed."""
+    start, end = encode_date(start), encode_date(end)
+    cursor.execute(RUNS_IN_SPAN_SQL, (module_id, end, start))
+    removed = 0
+    for run_id, run_start, run_end in cursor.fetchall():
+        removed += min(run_end, end) - max(run_start, start) + 1
+        cursor.execute("DELETE FROM streak_runs WHERE id = ?", (run_id,))
+        if run_start < start:
+            cursor.execute("INSERT INTO streak_runs (module_id, start_date, end_date) VALUES (?, ?, ?)",
+                           (module_id, run_start, start - 1))
+        if run_end > end:
+            cursor.execute("INSERT INTO streak_runs (module_id, start_date, end_date) VALUES (?, ?, ?)",
+                           (module_id, end + 1, run_end))
+    cursor.execute("DELETE FROM streak_notes WHERE module_id = ? AND date BETWEEN ? AND ?", (module_id, start, end))
+    return removed
+
+
+def delete_date(cursor, module_id, day):
+    return delete_range(cursor, module_id, day, day)
+
+
+def set_note(cursor, module_id, day, note):
+    if note:
+        cursor.execute(NOTE_UPSERT_SQL, (encode_date(day), module_id, note))
+    else:
+        cursor.execute("DELETE FROM streak_notes WHERE date = ? AND module_id = ?", (encode_date(day), module_id))
+
+
+# Connection-level helpers: each one is a complete unit of work that can be
+# queued on a DatabaseWorker as-is. They leave committing to the caller so
+# the worker can group a burst of edits into one transaction; headless
+# callers wrap them in ``with conn:``. Those that write are marked with
+# ``writes``.
+
+def load_modules(conn):
+    return conn.execute("SELECT id, name FROM modules WHERE id NOT IN (SELECT module_id FROM pending_deletes) "
+                        "ORDER BY name").fetchall()
+
+
+@writes
+def add_module(conn, name):
+    return conn.execute("INSERT INTO modules (name) VALUES (?)", (name,)).lastrowid
+
+
+@writes
+def delete_module(conn, name):
+    row = conn.execute("SELECT id FROM modules WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return
+    # Without the stats row first, the run triggers have nothing to maintain
+    conn.execute("DELETE FROM module_stats WHERE module_id = ?", row)
+    conn.execute("DELETE FROM streak_notes WHERE module_id = ?", row)
+    conn.execute("DELETE FROM streak_runs WHERE module_id = ?", row)
+    conn.execute("DELETE FROM modules WHERE id = ?", row)
+
+
+@writes
+def delete_module_chunk(conn, module_id, limit=DELETE_CHUNK):
+    """Delete up to ``limit`` notes or runs of a module; True once it is gone.
+
+    Queue it again until it returns True: each call is a short job, so a
+    module with years of history never holds the worker for long. The
+    module row goes last, once nothing refers to it. Until then the module
+    is listed in ``pending_deletes``, which hides it from ``load_modules``
+    and lets ``create_tables`` finish the delete if the app closes first.
+    """
+    conn.execute("INSERT OR IGNORE INTO pending_deletes (module_id) SELECT id FROM modules WHERE id = ?",
+                 (module_id,))
+    # Without the stats row first, the run triggers have nothing to maintain
+    conn.execute("DELETE FROM module_stats WHERE module_id = ?", (module_id,))
+    for table in ("streak_notes", "streak_runs"):
+        if conn.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE module_id = ? LIMIT ?)",
+                        (module_id, limit)).rowcount:
+            return False
+    conn.execute("DELETE FROM modules WHERE id = ?", (module_id,))
+    return True
+
+
+@writes
+def delete_orphans(conn, limit=DELETE_CHUNK):
+    """Delete rows whose module no longer exists, ``limit`` rows per commit.
+
+    Older versions never turned foreign keys on, so deleting a module left
+    its rows behind. Returns the number of rows deleted.
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    removed = 0
+    for table in ("module_stats", "streaks", "streak_notes", "streak_runs"):
+        if table not in tables or "module_id" not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            continue
+        key = "module_id" if table == "module_stats" else "id"
+        while True:
+            count = conn.execute(f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {table} "
+                                 f"WHERE module_id NOT IN (SELECT id FROM modules) LIMIT ?)", (limit,)).rowcount
+            conn.commit()
+            removed += count
+            if count < limit:
+                break
+    return removed
+
+
+@writes
+def vacuum_step(conn, pages=VACUUM_STEP):
+    """Return up to ``pages`` free pages to the file system; returns how many are left.
+
+    Needs incremental auto-vacuum, which databases created before it was
+    the default only get from a full ``vacuum``.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:  # Not INCREMENTAL
+        return 0
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def vacuum(conn):
+    """Rebuild the file, switching it to incremental auto-vacuum; returns its size before and after.
+
+    Runs outside any transaction and rewrites the whole database, so it is
+    a maintenance command rather than something the app does on its own.
+    """
+    def size():
+        return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+    before = size()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    return before, size()
+
+
+@writes
+def rename_module(conn, old_name, new_name):
+    conn.execute("UPDATE modules SET name = ? WHERE name = ?", (new_name, old_name))
+
+
+@writes
+def record_date(conn, module_id, day, note=None):
+    """Add ``day`` with an optional note; returns 1 if it was new, else 0."""
+    cursor = conn.cursor()
+    added = add_date(cursor, module_id, day)
+    set_note(cursor, module_id, day, note)
+    return added
+
+
+@writes
+def update_note(conn, module_id, day, note):
+    set_note(conn.cursor(), module_id, day, note)
+
+
+@writes
+def remove_dates(conn, module_id, start, end):
+    return delete_range(conn.cursor(), module_id, start, end)
@@ -0,0 +1,212 @@
+"""Opt-in timing of the tracker's hot paths.
+
+A ``Tracer`` replaces chosen methods and functions with timed wrappers, so
+when tracing is off nothing is wrapped and nothing is paid. Each wrapped
+call is a *stage* (``db load_snapshot``, ``engine``, ``list``, ``plot``,
+``draw``...) whose latencies go into a ``LatencyHistogram``. Stages and SQL
+statements are attributed to the user *action* that was started last, e.g.
+selecting a module or adding a range, until the next one begins.
+
+With a path, every stage and action is also appended to a JSON lines trace,
+followed by the histograms when the tracer is closed.
+"""
+import functools
+import json
+import threading
+import time
+
+HISTOGRAM_BUCKETS = 32  # Powers of two of microseconds, up to ~36 minutes
+
+
+class LatencyHistogram:
+    """Latency counts in power-of-two microsecond buckets, plus row totals."""
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def add(self, seconds, rows=0):
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+
+    def percentile(self, q):
+        """Upper bound, in seconds, of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "rows": self.rows,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "max_ms": self.max * 1000,
+            # Upper bound in microseconds -> count, for the non-empty buckets
+            "buckets": {1 << bucket: count for bucket, count in enumerate(self.counts) if count},
+        }
+
+
+def count_rows(result):
+    # Rough size of what a database job returned, for the per-stage row totals
+    if hasattr(result, "run_starts"):
+        return len(result.run_starts) + len(result.notes)
+    if isinstance(result, int):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+class Tracer:
+    def __init__(self, path=None):
+        self.histograms = {}
+        self.statements = 0
+        self.action = None
+        self.last_action = None
+        self.wrapped = []  # (owner, name, original or None if it came from the class) to undo on close
+        self.lock = threading.Lock()
+        self.local = threading.local()  # .counting while a traced database job runs on this thread
+        self.began = time.perf_counter()
+        self.file = open(path, "a", encoding="utf-8") if path else None
+
+    def wrap(self, func, stage, rows=None):
+        # functools.wraps keeps marks such as streak_store.writes on the wrapper
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            began = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.record(stage, began, time.perf_counter(), rows(result) if rows is not None else 0)
+            return result
+        return timed
+
+    def instrument(self, owner, name, stage=None, rows=None):
+        """Replace ``owner.name`` with a timed wrapper recording ``stage``."""
+        original = self.take(owner, name)
+        setattr(owner, name, self.wrap(original, stage or name, rows))
+
+    def instrument_action(self, owner, name):
+        """Make each call of ``owner.name`` start a new action."""
+        original = self.take(owner, name)
+
+        def action(*args, **kwargs):
+            self.begin_action(name)
+            return original(*args, **kwargs)
+        setattr(owner, name, action)
+
+    def instrument_worker(self, worker):
+        """Time every job of a ``DatabaseWorker`` as a ``db <function>`` stage.
+
+        Only the SQL of these jobs is counted. Jobs queued with
+        ``submit_background`` are neither timed nor counted, so a poll
+        running while nothing happens is not charged to the last action.
+        """
+        submit = self.take(worker, "submit")
+
+        def traced_submit(func, *args):
+            timed = self.wrap(func, f"db {func.__name__}", count_rows)
+
+            @functools.wraps(func)
+            def job(*args):
+                self.local.counting = True
+                try:
+                    return timed(*args)
+                finally:
+                    self.local.counting = False
+            return submit(job, *args)
+        worker.submit = traced_submit
+
+    def take(self, owner, name):
+        original = getattr(owner, name)
+        own = getattr(owner, "__dict__", {}).get(name)
+        self.wrapped.append((owner, name, own))
+        return original
+
+    def count_statement(self, sql):
+        # sqlite3 trace callback; statements run by triggers are reported as comments
+        if getattr(self.local, "counting", False) and not sql.startswith("--"):
+            with self.lock:
+                self.statements += 1
+
+    def record(self, stage, began, ended, rows=0):
+        seconds = ended - began
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.add(seconds, rows)
+            action = self.action
+            if action is not None:
+                action["stages"][stage] = action["stages"].get(stage, 0.0) + seconds
+                action["ended"] = max(action["ended"], ended)
+        self.write({"event": "stage", "t": began - self.began, "stage": stage, "ms": seconds * 1000,
+                    "rows": rows, "action": action["name"] if action is not None else None})
+
+    def begin_action(self, name):
+        self.end_action()
+        now = time.perf_counter()
+        with self.lock:
+            self.action = {"name": name, "began": now, "ended": now, "statements": self.statements, "stages": {}}
+
+    def end_action(self):
+        with self.lock:
+            action, self.action = self.action, None
+            if action is None:
+                return
+            summary = self.summarize(action)
+            self.last_action = summary
+        self.write({"event": "action", "t": action["began"] - self.began, **summary})
+        if self.file is not None:
+            self.file.flush()
+
+    def summarize(self, action):
+        return {
+            "action": action["name"],
+            "ms": (action["ended"] - action["began"]) * 1000,
+            "sql": self.statements - action["statements"],
+            "stages": {stage: seconds * 1000 for stage, seconds in action["stages"].items()},
+        }
+
+    def status(self):
+        """One line describing the latest action, for the status bar."""
+        with self.lock:
+            summary = self.summarize(self.action) if self.action is not None else self.last_action
+        if summary is None:
+            return "No actions traced yet"
+        stages = "  ".join(f"{stage} {ms:.1f}" for stage, ms in summary["stages"].items())
+        return f"{summary['action']}: {summary['ms']:.1f} ms, {summary['sql']} SQL | {stages}"
+
+    def write(self, event):
+        if self.file is not None:
+            line = json.dumps(event)
+            with self.lock:
+                self.file.write(line + "\n")
+
+    def close(self):
+        self.end_action()
+        for owner, name, original in reversed(self.wrapped):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.wrapped = []
+        self.write({"event": "histograms", "t": time.perf_counter() - self.began,
+                    "stages": {stage: histogram.as_dict() for stage, histogram in self.histograms.items()}})
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,21 +1,73 @@
+import functools
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import tkinter as tk
 from tkinter import messagebox, ttk
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
-
-from tkcalendar import DateEntry
+import streak_store
+from streak_engine import ModuleSnapshot
+from streak_widgets import SummaryTable, VirtualList, day_text, run_text
+from streak_worker import DatabaseWorker, TkDispatcher
 
 DB_NAME = "streaks.db"
+SNAPSHOT_CACHE_SIZE = 16  # Recently viewed modules kept in memory
+# Methods that start a new user action when timings are traced
+TRACED_ACTIONS = ("on_module_select", "select_module", "add_date", "delete_date", "add_date_range",
+                  "delete_date_range", "add_module", "delete_module", "rename_module", "open_dashboard",
+                  "run_search", "show_external_changes")
+TRACE_BAR_INTERVAL = 500  # ms between refreshes of the timings bar
+CHANGE_POLL_INTERVAL = 1000  # ms between checks for commits by other processes
+SEARCH_DELAY = 150  # ms of no typing before the notes are searched
+
+
+def date_entry(parent):
+    # tkcalendar is imported on first use so importing this module stays cheap
+    from tkcalendar import DateEntry
+    return DateEntry(parent, date_pattern='yyyy-MM-dd')
+
 
 class StreakTrackerApp:
-    def __init__(self, root):
+    def __init__(self, root, tracer=None):
         self.root = root
         self.root.title("Streak Tracker")
+        self.create_style()
+        self.tracer = tracer  # streak_trace.Tracer when timings were asked for
+        if tracer is not None:
+            self.instrument()
+
+        # All SQLite work runs on a worker thread; results come back through the dispatcher
+        self.db = DatabaseWorker(self.connect)
+        if tracer is not None:
+            tracer.instrument_worker(self.db)
+        self.dispatcher = TkDispatcher(self.root)
+        self.create_table()
+
+        self.selected_module_index = None  # Track selected module index
+        self.module_ids = {}  # Module name -> id, refreshed by load_modules
+        self.deleting = set()  # Ids of modules whose rows are still being deleted, kept out of the list
+        self.snapshot = None  # Data of the selected module, reset after writes
+        self.snapshots = {}  # Module id -> last loaded snapshot, least recently used first
+        self.pending_load = None
+        self.load_generation = 0  # Bumped per load so superseded results are dropped
+        self.dashboard = None  # SummaryTable of the dashboard window while it is open
+        self.search_results = None  # Listbox of the search window while it is open
+        self.search_hits = []  # (module_id, module_name, day, note) shown in search_results
+        self.search_after = None
+        self.search_generation = 0
+        self.focus_day = None  # (module_id, day) to show once that module is plotted
+        self.renderer = None  # Created once the window is on screen
+        self.calendar = None  # CalendarRenderer, created when the calendar view is first picked
+        self.calendar_view = False
+        self.data_version = None  # PRAGMA data_version at the last poll
+        self.module_versions = {}  # Module id -> module_stats version at the last poll
+
+        self.create_widgets()
+        self.load_modules()
+        self.watch_database()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def create_style(self):
         self.style = ttk.Style()
         self.style.theme_use('clam')
 
@@ -28,59 +80,81 @@ class StreakTrackerApp:
                        foreground=[('active', 'white')],
                        background=[('active', '#005050')])
 
-        self.conn = sqlite3.connect(DB_NAME)
-        self.create_table()
+    def connect(self):
+        conn = streak_store.connect(DB_NAME)
+        if self.tracer is not None:
+            conn.set_trace_callback(self.tracer.count_statement)
+        return conn
 
-        self.selected_module_index = None  # Track selected module index
+    def instrument(self):
+        # Before create_widgets, so buttons and bindings pick up the wrapped methods
+        import streak_engine
 
-        self.create_widgets()
-        self.load_modules()
-        self.load_data()
-        self.plot_streak()
+        for name in TRACED_ACTIONS:
+            self.tracer.instrument_action(self, name)
+        self.tracer.instrument(streak_engine, "compute_runs", "engine", rows=lambda result: result.ordinals.size)
+        self.tracer.instrument(self, "show_dates", "list")
+        self.tracer.instrument(self, "plot_streak", "plot")
 
     def create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS modules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            )
-        ''')
-        # Check if streaks table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='streaks'")
-        if cursor.fetchone() is None:
-            self._create_streaks_table(cursor)
-            self.conn.commit()
-        else:
-            cursor.execute("PRAGMA table_info(streaks)")
-            columns = [info[1] for info in cursor.fetchall()]
-            if 'module_id' not in columns:
-                self._migrate_streaks_table(cursor)
-                self.conn.commit()
-            if 'note' not in columns:
-                cursor.execute("ALTER TABLE streaks ADD COLUMN note TEXT")
-                self.conn.commit()
-
-    def _create_streaks_table(self, cursor):
-        cursor.execute('''
-            CREATE TABLE streaks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                module_id INTEGER NOT NULL,
-                note TEXT,
-                UNIQUE(date, module_id),
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
-            )
-        ''')
-
-    def _migrate_streaks_table(self, cursor):
-        cursor.execute("ALTER TABLE streaks RENAME TO streaks_old")
-        self._create_streaks_table(cursor)
-        cursor.execute("SELECT id FROM modules WHERE id=1")
-        if cursor.fetchone() is None:
-            cursor.execute("INSERT INTO modules (id, name) VALUES (1, 'default')")
-        cursor.execute("INSERT INTO streaks (id, date, module_id, note) SELECT id, date, 1, NULL FROM streaks_old")
-        cursor.execute("DROP TABLE streaks_old")
+        self.db.call(streak_store.create_tables)
+
+    def on_close(self):
+        self.db.close()
+        if self.tracer is not None:
+            self.tracer.close()
+        self.root.destroy()
+
+    def run_write(self, func, *args, on_done=None):
+        # Queue a write on the worker; on_done(result) runs on the Tk thread once it has committed
+        versions = {}
+
+        # Versions read under the write lock, so the change polls only see other processes' commits
+        @functools.wraps(func)
+        def write(conn, *args):
+            versions["before"] = streak_store.load_versions(conn)
+            result = func(conn, *args)
+            versions["after"] = streak_store.load_versions(conn)
+            return result
+
+        def finished(future):
+            error = future.exception()
+            if error is not None:
+                messagebox.showerror("Database Error", f"An error occurred: {error}")
+                self.snapshot = None
+                self.load_data()
+            else:
+                self.count_own_changes(versions["before"], versions["after"])
+                if on_done is not None:
+                    on_done(future.result())
+                self.refresh_dashboard()
+        return self.dispatcher.then(self.db.submit(write, *args), finished)
+
+    def count_own_changes(self, before, after):
+        # Move the versions seen by the last poll on by this app's own writes alone
+        for module_id in before.keys() | after.keys():
+            if before.get(module_id) == after.get(module_id):
+                continue
+            if module_id not in after:
+                self.module_versions.pop(module_id, None)
+            elif module_id in self.module_versions:
+                self.module_versions[module_id] += after[module_id] - before.get(module_id, 0)
+            elif module_id not in before:
+                self.module_versions[module_id] = after[module_id]
+
+    def check_recorded_date(self, module_id, day, then):
+        # then(recorded) runs on the Tk thread, at once if the module's snapshot is loaded
+        if self.snapshot is not None and self.snapshot.module_id == module_id:
+            then(self.snapshot.contains(day))
+            return
+
+        def checked(future):
+            error = future.exception()
+            if error is not None:
+                messagebox.showerror("Database Error", f"An error occurred: {error}")
+                return
+            then(future.result())
+        self.dispatcher.then(self.db.submit(lambda conn: streak_store.has_date(conn.cursor(), module_id, day)), checked)
 
     def create_widgets(self):
         main_frame = ttk.Frame(self.root)
@@ -100,7 +174,34 @@ class StreakTrackerApp:
         self._create_streak_info_labels(right_frame)
         self._create_dates_listbox(right_frame)
         self._create_delete_range_entry(right_frame)
-        self._create_plot_area(left_frame)
+        if self.tracer is not None:
+            self._create_trace_bar(main_frame)
+        # The plot, and importing matplotlib for it, waits until the controls are on screen
+        self.plot_frame = left_frame
+        self.root.bind("<Map>", self.on_first_map, add="+")
+
+    def _create_trace_bar(self, main_frame):
+        # Timings of the latest action under the window; F2 shows and hides it
+        self.trace_bar = ttk.Label(self.root, anchor=tk.W, font=("Courier", 9), relief=tk.SUNKEN)
+
+        def toggle(event=None):
+            if self.trace_bar.winfo_manager():
+                self.trace_bar.pack_forget()
+            else:
+                self.trace_bar.pack(side=tk.BOTTOM, fill=tk.X, before=main_frame)
+        toggle()
+        self.root.bind("<F2>", toggle)
+        self.update_trace_bar()
+
+    def update_trace_bar(self):
+        self.trace_bar.config(text=self.tracer.status())
+        self.root.after(TRACE_BAR_INTERVAL, self.update_trace_bar)
+
+    def on_first_map(self, event):
+        if event.widget is not self.root:
+            return
+        self.root.unbind("<Map>")
+        self.root.after_idle(self._create_plot_area, self.plot_frame)
 
     def _create_module_management(self, parent):
         module_frame = ttk.Frame(parent)
@@ -119,11 +220,16 @@ class StreakTrackerApp:
         rename_module_button = ttk.Button(module_button_frame, text="R", width=3, command=self.rename_module, style='Prominent.TButton')
         rename_module_button.pack(pady=2)
 
+        dashboard_button = ttk.Button(module_frame, text="Dashboard", command=self.open_dashboard, style='Prominent.TButton')
+        dashboard_button.grid(row=2, column=0, padx=5, pady=2, sticky="ew")
+        search_button = ttk.Button(module_frame, text="Search Notes", command=self.open_search, style='Prominent.TButton')
+        search_button.grid(row=3, column=0, padx=5, pady=2, sticky="ew")
+
     def _create_single_date_entry(self, parent):
         single_date_frame = ttk.Frame(parent)
         single_date_frame.pack(pady=5, fill=tk.X)
         ttk.Label(single_date_frame, text="Streak Date (YYYY-MM-DD):").grid(row=0, column=0, padx=5)
-        self.date_entry = DateEntry(single_date_frame, date_pattern='yyyy-MM-dd')
+        self.date_entry = date_entry(single_date_frame)
         self.date_entry.grid(row=0, column=1, padx=5)
 
         add_button = ttk.Button(single_date_frame, text="Add Date", command=self.add_date, style='Prominent.TButton')
@@ -136,9 +242,9 @@ class StreakTrackerApp:
         range_date_frame = ttk.Frame(parent)
         range_date_frame.pack(pady=5, fill=tk.X)
         ttk.Label(range_date_frame, text="Add Date Range:").grid(row=0, column=0, padx=5)
-        self.start_date_entry = DateEntry(range_date_frame, date_pattern='yyyy-MM-dd')
+        self.start_date_entry = date_entry(range_date_frame)
         self.start_date_entry.grid(row=0, column=1, padx=5)
-        self.end_date_entry = DateEntry(range_date_frame, date_pattern='yyyy-MM-dd')
+        self.end_date_entry = date_entry(range_date_frame)
         self.end_date_entry.grid(row=0, column=2, padx=5)
 
         add_range_button = ttk.Button(range_date_frame, text="Add Date Range", command=self.add_date_range, style='Prominent.TButton')
@@ -154,39 +260,38 @@ class StreakTrackerApp:
         list_frame = ttk.Frame(parent)
         list_frame.pack(pady=10, fill=tk.BOTH, expand=False)
 
-        self.dates_listbox = tk.Listbox(list_frame, selectmode=tk.MULTIPLE, height=6)
-        self.dates_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.collapse_runs = tk.BooleanVar(value=False)
+        collapse_check = ttk.Checkbutton(list_frame, text="Collapse runs", variable=self.collapse_runs, command=self.show_dates)
+        collapse_check.pack(anchor=tk.W)
 
-        def ignore_event(event):
-            return "break"
-        self.dates_listbox.bind("<Button-1>", ignore_event)
-        self.dates_listbox.bind("<B1-Motion>", ignore_event)
-        self.dates_listbox.bind("<Key>", ignore_event)
+        self.dates_list = VirtualList(list_frame, height=6)
+        self.dates_list.pack(fill=tk.BOTH, expand=True)
 
         self.module_listbox.bind("<FocusOut>", self.on_module_listbox_focus_out)
         self.module_listbox.bind("<FocusIn>", self.on_module_listbox_focus_in)
 
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
-        scrollbar.config(command=self.dates_listbox.yview)
-        scrollbar.pack(side=tk.LEFT, fill=tk.Y)
-        self.dates_listbox.config(yscrollcommand=scrollbar.set)
-
     def _create_delete_range_entry(self, parent):
         delete_range_frame = ttk.Frame(parent)
         delete_range_frame.pack(pady=10, fill=tk.X)
 
         ttk.Label(delete_range_frame, text="Delete Date Range:").grid(row=0, column=0, padx=5)
-        self.delete_start_date_entry = DateEntry(delete_range_frame, date_pattern='yyyy-MM-dd')
+        self.delete_start_date_entry = date_entry(delete_range_frame)
         self.delete_start_date_entry.grid(row=0, column=1, padx=5)
-        self.delete_end_date_entry = DateEntry(delete_range_frame, date_pattern='yyyy-MM-dd')
+        self.delete_end_date_entry = date_entry(delete_range_frame)
         self.delete_end_date_entry.grid(row=0, column=2, padx=5)
 
         delete_range_button = ttk.Button(delete_range_frame, text="Delete Date Range", command=self.delete_date_range, style='Prominent.TButton')
         delete_range_button.grid(row=0, column=3, padx=5)
 
     def _create_plot_area(self, parent):
-        plt.style.use('ggplot')
-        self.figure = plt.Figure(figsize=(6,4), dpi=100)
+        import matplotlib.style
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        from streak_plot import StreakRenderer
+
+        matplotlib.style.use('ggplot')
+        self.figure = Figure(figsize=(6,4), dpi=100)
         self.ax = self.figure.add_subplot(111)
         self.ax.set_title("Streak Over Time", color="#2E4053", fontsize=14, fontweight='bold')
         self.ax.set_xlabel("Date", color="#34495E", fontsize=12)
@@ -197,8 +302,32 @@ class StreakTrackerApp:
         self.ax.tick_params(axis='y', colors='#34495E')
         self.ax.grid(True, linestyle='--', alpha=0.5, color='#D5D8DC')
 
+        view_frame = ttk.Frame(parent)
+        view_frame.pack(fill=tk.X)
+        self.plot_view = tk.StringVar(value="line")
+        for text, value in (("Streak line", "line"), ("Calendar", "calendar")):
+            ttk.Radiobutton(view_frame, text=text, value=value, variable=self.plot_view,
+                            command=self.switch_plot_view).pack(side=tk.LEFT, padx=5)
+
         self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        if self.tracer is not None:
+            self.tracer.instrument(self.canvas, "draw")
+        self.renderer = StreakRenderer(self.canvas, self.ax)
+        if self.snapshot is not None:
+            self.plot_streak()
+
+    def switch_plot_view(self):
+        self.calendar_view = self.plot_view.get() == "calendar"
+        if self.calendar_view and self.calendar is None:
+            from streak_plot import CalendarRenderer
+            self.calendar = CalendarRenderer(self.canvas)
+        self.ax.set_visible(not self.calendar_view)
+        if self.calendar is not None:
+            self.calendar.set_visible(self.calendar_view)
+        if self.snapshot is not None:
+            self.plot_streak()
+        self.canvas.draw_idle()
 
     def add_date(self):
         print("add_date method called")
@@ -223,43 +352,84 @@ class StreakTrackerApp:
             messagebox.showwarning("No Module Selected", "Please select a module to add the date.")
             return
     
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("INSERT INTO streaks (date, module_id, note) VALUES (?, ?, ?)", (date_str, module_id, note_text if note_text else None))
-            self.conn.commit()
-            self.load_data()
-            self.plot_streak()
-        except sqlite3.IntegrityError:
+        def checked(recorded):
+            if not recorded:
+                self.run_write(streak_store.record_date, module_id, date_obj, note_text,
+                               on_done=lambda added: self.apply_day_change(module_id, date_obj, added=True, note=note_text))
+                return
             # Date already exists, ask if user wants to update the note
             update = messagebox.askyesno("Duplicate Date", "This date is already recorded for the selected module. Do you want to update the note?")
             if update:
                 if len(note_text) > 50:
                     messagebox.showwarning("Note Too Long", "Note must be 50 characters or less.")
                     return
-                try:
-                    cursor.execute("UPDATE streaks SET note = ? WHERE date = ? AND module_id = ?", (note_text if note_text else None, date_str, module_id))
-                    self.conn.commit()
-                    self.load_data()
+
+                def note_updated(result):
+                    if self.snapshot is not None and self.snapshot.module_id == module_id:
+                        self.snapshot.set_note(date_obj, note_text)
                     self.plot_streak()
-                except Exception as e:
-                    messagebox.showerror("Database Error", f"An error occurred while updating the note: {e}")
-        except Exception as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
+                self.run_write(streak_store.update_note, module_id, date_obj, note_text, on_done=note_updated)
+        self.check_recorded_date(module_id, date_obj, checked)
 
     def load_data(self):
         module_id = self.get_selected_module_id()
+        if self.snapshot is not None and self.snapshot.module_id == module_id:
+            self.show_snapshot()
+            return
+        if self.pending_load is not None:
+            self.pending_load.cancel()
+        self.load_generation += 1
+        generation = self.load_generation
         if module_id is None:
-            self.dates = []
+            self.snapshot = ModuleSnapshot(None, [], [], {})
+            self.show_snapshot()
+            return
+        # A module viewed before is only reloaded if its stored version moved on
+        cached = self.snapshots.get(module_id)
+
+        def loaded(future):
+            if generation != self.load_generation:
+                return  # A newer selection has been made since
+            error = future.exception()
+            if error is not None:
+                messagebox.showerror("Database Error", f"An error occurred while loading the module: {error}")
+                return
+            self.snapshot = future.result() or cached
+            self.snapshots.pop(module_id, None)
+            self.snapshots[module_id] = self.snapshot
+            while len(self.snapshots) > SNAPSHOT_CACHE_SIZE:
+                self.snapshots.pop(next(iter(self.snapshots)))
+            self.show_snapshot()
+        version = cached.version if cached is not None else None
+        self.pending_load = self.dispatcher.then(self.db.submit(streak_store.load_snapshot, module_id, version), loaded)
+
+    def show_snapshot(self):
+        self.show_dates()
+        self.plot_streak()
+
+    def show_dates(self, keep_position=False):
+        # Only the visible rows are formatted, straight from the snapshot arrays
+        if self.collapse_runs.get():
+            starts, ends = self.snapshot.run_starts, self.snapshot.run_ends
+            self.dates_list.set_source(len(starts), lambda i: run_text(starts[i], ends[i]), keep_position)
         else:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT date FROM streaks WHERE module_id = ? ORDER BY date", (module_id,))
-            rows = cursor.fetchall()
-            self.dates = [datetime.strptime(row[0], "%Y-%m-%d").date() for row in rows]
+            ordinals = self.snapshot.streaks.ordinals
+            self.dates_list.set_source(ordinals.size, lambda i: day_text(ordinals[i]), keep_position)
 
-        # Update the listbox with dates
-        self.dates_listbox.delete(0, tk.END)
-        for date in self.dates:
-            self.dates_listbox.insert(tk.END, date.strftime("%Y-%m-%d"))
+    def apply_day_change(self, module_id, day, added, note=None):
+        # Patch the cached snapshot instead of reloading the module
+        if self.snapshot is None or self.snapshot.module_id != module_id:
+            self.snapshot = None
+            self.load_data()
+            return
+        if added:
+            delta = self.snapshot.add_day(day, note)
+        else:
+            delta = self.snapshot.remove_day(day)
+        if delta is None:
+            return
+        self.show_dates(keep_position=True)
+        self.plot_streak(delta)
 
     def add_date_range(self):
         start_date_str = self.start_date_entry.get()
@@ -280,27 +450,11 @@ class StreakTrackerApp:
             messagebox.showwarning("No Module Selected", "Please select a module to add the date range.")
             return
 
-        cursor = self.conn.cursor()
-        current_date = start_date
-        added_count = 0
-        while current_date <= end_date:
-            date_str = current_date.strftime("%Y-%m-%d")
-            try:
-                cursor.execute("INSERT INTO streaks (date, module_id) VALUES (?, ?)", (date_str, module_id))
-                added_count += 1
-            except sqlite3.IntegrityError:
-                # Ignore duplicates
-                pass
-            except Exception as e:
-                messagebox.showerror("Database Error", f"An error occurred: {e}")
-                break
-            current_date += timedelta(days=1)
-        self.conn.commit()
-
-        self.load_data()
-        self.plot_streak()
-
-        messagebox.showinfo("Date Range Added", f"Added {added_count} new date(s) to the streaks.")
+        def range_added(added_count):
+            self.snapshot = None
+            self.load_data()
+            messagebox.showinfo("Date Range Added", f"Added {added_count} new date(s) to the streaks.")
+        self.run_write(streak_store.add_ranges, [(module_id, start_date, end_date)], on_done=range_added)
 
     def delete_date_range(self):
         start_date_str = self.delete_start_date_entry.get()
@@ -321,14 +475,11 @@ class StreakTrackerApp:
             messagebox.showwarning("No Module Selected", "Please select a module to delete dates from.")
             return
 
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM streaks WHERE date BETWEEN ? AND ? AND module_id = ?", (start_date_str, end_date_str, module_id))
-        self.conn.commit()
-
-        self.load_data()
-        self.plot_streak()
-
-        messagebox.showinfo("Date Range Deleted", f"Deleted dates from {start_date_str} to {end_date_str}.")
+        def range_deleted(removed_count):
+            self.snapshot = None
+            self.load_data()
+            messagebox.showinfo("Date Range Deleted", f"Deleted dates from {start_date_str} to {end_date_str}.")
+        self.run_write(streak_store.remove_dates, module_id, start_date, end_date, on_done=range_deleted)
 
     def prompt_note_popup(self):
         self.note_text = None
@@ -361,105 +512,24 @@ class StreakTrackerApp:
         
         return self.note_text
 
-    def plot_streak(self):
-        self.ax.clear()
-        self.ax.set_title("Streak Over Time", color="#2E4053", fontsize=14, fontweight='bold')
-        self.ax.set_xlabel("Date", color="#34495E", fontsize=12)
-        self.ax.set_ylabel("Streak Length (days)", color="#34495E", fontsize=12)
-        self.ax.spines['bottom'].set_color('#34495E')
-        self.ax.spines['left'].set_color('#34495E')
-        self.ax.tick_params(axis='x', colors='#34495E')
-        self.ax.tick_params(axis='y', colors='#34495E')
-        self.ax.grid(True, linestyle='--', alpha=0.5, color='#D5D8DC')
-
-        if not self.dates:
-            self.breaks_label.config(text="Streak breaks: 0")
-            self.highest_streak_label.config(text="Highest streak: 0")
-            self.canvas.draw()
-            return
-
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT date, note FROM streaks WHERE module_id = ? ORDER BY date", (self.get_selected_module_id(),))
-        notes_dict = {datetime.strptime(row[0], "%Y-%m-%d").date(): row[1] for row in cursor.fetchall()}
-
-        streak_lengths = []
-        max_streak = 0
-        current_streak = 0
-        previous_date = None
-        breaks_dates = []
-
-        for date in self.dates:
-            if previous_date and (date - previous_date).days == 1:
-                current_streak += 1
-            else:
-                if previous_date is not None:
-                    breaks_dates.append(date)
-                current_streak = 1
-            streak_lengths.append(current_streak)
-            if current_streak > max_streak:
-                max_streak = current_streak
-            previous_date = date
+    def plot_streak(self, delta=None):
+        # With the StreakDelta of a single-day edit, only what it changed is replotted
+        streaks = self.snapshot.streaks
 
         # Update the breaks label with the count of streak breaks
-        self.breaks_label.config(text=f"Streak breaks: {len(breaks_dates)}")
+        self.breaks_label.config(text=f"Streak breaks: {streaks.breaks.size}")
         # Update the highest streak label with the max streak value
-        self.highest_streak_label.config(text=f"Highest streak: {max_streak}")
-
-        line, = self.ax.plot(self.dates, streak_lengths, marker='o', linestyle='-', color='#2980B9', markerfacecolor='#85C1E9', markeredgecolor='#1B4F72', linewidth=2)
-        self.ax.set_ylim(0, max_streak + 1)
-
-        # Highlight the highest streak points with a different marker and color
-        max_streak_value = max(streak_lengths)
-        max_streak_indices = [i for i, val in enumerate(streak_lengths) if val == max_streak_value]
-        max_streak_dates = [self.dates[i] for i in max_streak_indices]
-        max_streak_points = [streak_lengths[i] for i in max_streak_indices]
-
-        self.ax.scatter(max_streak_dates, max_streak_points, color='#E74C3C', s=100, label='Highest Streak', zorder=5, edgecolors='black')
-
-        # Highlight the streak breaks with a different marker and color
-        if breaks_dates:
-            self.ax.scatter(breaks_dates, [0]*len(breaks_dates), color='#F39C12', s=100, label='Streak Break', zorder=5, edgecolors='black', marker='X')
-
-        # Format x-axis with date locator and formatter for better readability
-        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        self.figure.autofmt_xdate()
-
-        self.ax.legend()
-
-        # Create annotation for hover
-        annot = self.ax.annotate("", xy=(0,0), xytext=(15,15), textcoords="offset points",
-                                 bbox=dict(boxstyle="round", fc="w"),
-                                 arrowprops=dict(arrowstyle="->"))
-        annot.set_visible(False)
-
-        def update_annot(ind):
-            x, y = line.get_data()
-            annot.xy = (x[ind["ind"][0]], y[ind["ind"][0]])
-            date_str = self.dates[ind["ind"][0]].strftime('%Y-%m-%d')
-            note = notes_dict.get(self.dates[ind["ind"][0]])
-            text = f"Date: {date_str}\nStreak: {y[ind['ind'][0]]}"
-            if note:
-                text += f"\nNote: {note}"
-            annot.set_text(text)
-            annot.get_bbox_patch().set_alpha(0.9)
-
-        def hover(event):
-            vis = annot.get_visible()
-            if event.inaxes == self.ax:
-                cont, ind = line.contains(event)
-                if cont:
-                    update_annot(ind)
-                    annot.set_visible(True)
-                    self.canvas.draw_idle()
-                else:
-                    if vis:
-                        annot.set_visible(False)
-                        self.canvas.draw_idle()
-
-        self.figure.canvas.mpl_connect("motion_notify_event", hover)
+        self.highest_streak_label.config(text=f"Highest streak: {streaks.max_streak}")
 
-        self.canvas.draw()
+        if self.renderer is not None:
+            renderer = self.calendar if self.calendar_view else self.renderer
+            if delta is not None:
+                renderer.apply(streaks, self.snapshot.notes, delta)
+            else:
+                renderer.update(streaks, self.snapshot.notes)
+            if self.focus_day is not None and self.focus_day[0] == self.snapshot.module_id:
+                renderer.focus(self.focus_day[1])
+                self.focus_day = None
 
     def on_module_select(self, event):
         selected_indices = self.module_listbox.curselection()
@@ -468,7 +538,6 @@ class StreakTrackerApp:
         else:
             self.selected_module_index = None
         self.load_data()
-        self.plot_streak()
 
     def on_dates_listbox_focus(self, event):
         pass  # Removed to avoid interference
@@ -499,23 +568,21 @@ class StreakTrackerApp:
                 return None
         else:
             selected_module_name = self.module_listbox.get(selected_indices[0])
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id FROM modules WHERE name = ?", (selected_module_name,))
-        result = cursor.fetchone()
-        if result:
-            return result[0]
-        return None
+        return self.module_ids.get(selected_module_name)
 
     def add_module(self):
         module_name = tk.simpledialog.askstring("Add Module", "Enter module name:")
         if module_name:
-            cursor = self.conn.cursor()
-            try:
-                cursor.execute("INSERT INTO modules (name) VALUES (?)", (module_name,))
-                self.conn.commit()
-                self.load_modules()
-            except sqlite3.IntegrityError:
-                messagebox.showwarning("Duplicate Module", "This module already exists.")
+            def module_added(future):
+                error = future.exception()
+                if isinstance(error, sqlite3.IntegrityError):
+                    messagebox.showwarning("Duplicate Module", "This module already exists.")
+                elif error is not None:
+                    messagebox.showerror("Database Error", f"An error occurred: {error}")
+                else:
+                    self.load_modules()
+                    self.refresh_dashboard()
+            self.dispatcher.then(self.db.submit(streak_store.add_module, module_name), module_added)
 
     def delete_date(self):
         date_str = self.date_entry.get()
@@ -530,32 +597,175 @@ class StreakTrackerApp:
             messagebox.showwarning("No Module Selected", "Please select a module to delete the date from.")
             return
 
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id FROM streaks WHERE date = ? AND module_id = ?", (date_str, module_id))
-        if cursor.fetchone() is None:
-            messagebox.showwarning("Date Not Found", "The specified date is not recorded for the selected module.")
-            return
+        def checked(recorded):
+            if not recorded:
+                messagebox.showwarning("Date Not Found", "The specified date is not recorded for the selected module.")
+                return
 
-        confirm = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete the date {date_str}?")
-        if not confirm:
-            return
+            confirm = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete the date {date_str}?")
+            if not confirm:
+                return
 
-        cursor.execute("DELETE FROM streaks WHERE date = ? AND module_id = ?", (date_str, module_id))
-        self.conn.commit()
-
-        self.load_data()
-        self.plot_streak()
+            self.run_write(streak_store.remove_dates, module_id, date_obj, date_obj,
+                           on_done=lambda removed: self.apply_day_change(module_id, date_obj, added=False))
+        self.check_recorded_date(module_id, date_obj, checked)
 
     def load_modules(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM modules ORDER BY name")
-        modules = cursor.fetchall()
+        self.dispatcher.then(self.db.submit(streak_store.load_modules), self.show_modules)
+
+    def show_modules(self, future):
+        selected = self.get_selected_module_id()
+        modules = [module for module in future.result() if module[0] not in self.deleting]
+        self.module_ids = {name: module_id for module_id, name in modules}
         self.module_listbox.delete(0, tk.END)
         for module in modules:
-            self.module_listbox.insert(tk.END, module[0])
+            self.module_listbox.insert(tk.END, module[1])
         if modules:
-            self.module_listbox.selection_set(0)
+            # Keep the selected module selected, e.g. across a rename
+            ids = [module_id for module_id, _ in modules]
+            self.module_listbox.selection_set(ids.index(selected) if selected in ids else 0)
             self.on_module_select(None)
+        else:
+            self.selected_module_index = None
+            self.load_data()
+
+    def watch_database(self):
+        # Other processes may write to the same file. PRAGMA data_version only moves when one of
+        # them commits, so an idle poll is a single pragma on the worker.
+        def polled(future):
+            if future.exception() is None and future.result() is not None:
+                self.apply_external_changes(*future.result())
+            self.root.after(CHANGE_POLL_INTERVAL, self.watch_database)
+        self.dispatcher.then(self.db.submit_background(streak_store.poll_changes, self.data_version), polled)
+
+    def apply_external_changes(self, data_version, versions, modules):
+        # Only the modules whose stored version moved since the last poll are refreshed
+        first_poll = self.data_version is None
+        self.data_version = data_version
+        changed = {module_id for module_id in versions.keys() | self.module_versions.keys()
+                   if versions.get(module_id) != self.module_versions.get(module_id)}
+        self.module_versions = versions
+        listed = {name: module_id for module_id, name in modules if module_id not in self.deleting}
+        if not first_poll and (changed or listed != self.module_ids):
+            self.show_external_changes(changed, listed)
+
+    def show_external_changes(self, changed, listed):
+        if listed != self.module_ids:
+            self.snapshot = None
+            self.load_modules()
+        elif self.snapshot is not None and self.snapshot.module_id in changed:
+            self.snapshot = None
+            self.load_data()
+        if changed:
+            self.refresh_dashboard()
+
+    def open_dashboard(self):
+        if self.dashboard is not None:
+            self.dashboard.winfo_toplevel().lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("All Modules")
+        self.dashboard = SummaryTable(window, height=20, on_open=self.select_module)
+        self.dashboard.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def close():
+            self.dashboard = None
+            window.destroy()
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.refresh_dashboard()
+
+    def refresh_dashboard(self):
+        # Stats for every module come from one grouped query on the worker
+        if self.dashboard is None:
+            return
+
+        def loaded(future):
+            error = future.exception()
+            if error is not None:
+                messagebox.showerror("Database Error", f"An error occurred while loading the dashboard: {error}")
+            elif self.dashboard is not None:
+                self.dashboard.set_summaries(future.result())
+        self.dispatcher.then(self.db.submit(streak_store.load_summaries), loaded)
+
+    def open_search(self):
+        if self.search_results is not None:
+            self.search_results.winfo_toplevel().lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Search Notes")
+        self.search_text = tk.StringVar()
+        entry = ttk.Entry(window, textvariable=self.search_text, width=60)
+        entry.pack(fill=tk.X, padx=10, pady=(10, 5))
+        entry.focus_set()
+        results_frame = ttk.Frame(window)
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.search_results = tk.Listbox(results_frame, height=15, width=80, font=("Courier", 10))
+        scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.search_results.yview)
+        self.search_results.config(yscrollcommand=scrollbar.set)
+        self.search_results.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+
+        # Searches follow typing; Enter in the box opens the best hit, double-click or Enter opens the selected one
+        self.search_text.trace_add("write", lambda *args: self.schedule_search())
+        entry.bind("<Return>", lambda event: self.open_search_hit(0))
+        for sequence in ("<Double-Button-1>", "<Return>"):
+            self.search_results.bind(sequence, lambda event: self.open_search_hit(
+                (self.search_results.curselection() or (0,))[0]))
+
+        def close():
+            if self.search_after is not None:
+                self.root.after_cancel(self.search_after)
+                self.search_after = None
+            self.search_results = None
+            window.destroy()
+        window.protocol("WM_DELETE_WINDOW", close)
+
+    def schedule_search(self):
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+        self.search_after = self.root.after(SEARCH_DELAY, self.run_search)
+
+    def run_search(self):
+        # Ranked by the notes_fts index on the worker; results of superseded searches are dropped
+        self.search_after = None
+        self.search_generation += 1
+        generation = self.search_generation
+
+        def found(future):
+            if generation != self.search_generation or self.search_results is None:
+                return
+            error = future.exception()
+            if error is not None:
+                messagebox.showerror("Database Error", f"An error occurred while searching the notes: {error}")
+                return
+            self.show_search_hits(future.result())
+        self.dispatcher.then(self.db.submit(streak_store.search_notes, self.search_text.get()), found)
+
+    def show_search_hits(self, hits):
+        self.search_hits = hits
+        self.search_results.delete(0, tk.END)
+        if hits:
+            self.search_results.insert(tk.END, *[f"{name[:24]:<24} {day_text(day)}  {note}"
+                                                 for _, name, day, note in hits])
+
+    def open_search_hit(self, index):
+        if index < len(self.search_hits):
+            module_id, _, day, _ = self.search_hits[index]
+            self.jump_to_day(module_id, day)
+
+    def jump_to_day(self, module_id, day):
+        # plot_streak focuses the plot on the day once the module is shown
+        self.focus_day = (module_id, day)
+        self.select_module(module_id)
+
+    def select_module(self, module_id):
+        for index, name in enumerate(self.module_listbox.get(0, tk.END)):
+            if self.module_ids.get(name) == module_id:
+                self.module_listbox.selection_clear(0, tk.END)
+                self.module_listbox.selection_set(index)
+                self.module_listbox.see(index)
+                self.on_module_select(None)
+                return
 
     def delete_module(self):
         selected_indices = self.module_listbox.curselection()
@@ -568,12 +778,23 @@ class StreakTrackerApp:
         if not confirm:
             return
 
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM modules WHERE name = ?", (module_name,))
-        self.conn.commit()
+        # The module leaves the list at once; its rows go in short jobs so loads are never stuck behind them
+        module_id = self.module_ids[module_name]
+        self.deleting.add(module_id)
+        self.snapshots.pop(module_id, None)
         self.load_modules()
-        self.load_data()
-        self.plot_streak()
+
+        def chunk_deleted(done):
+            if not done:
+                self.run_write(streak_store.delete_module_chunk, module_id, on_done=chunk_deleted)
+                return
+            self.deleting.discard(module_id)
+            self.run_write(streak_store.vacuum_step, on_done=space_reclaimed)
+
+        def space_reclaimed(free_pages):
+            if free_pages:
+                self.run_write(streak_store.vacuum_step, on_done=space_reclaimed)
+        self.run_write(streak_store.delete_module_chunk, module_id, on_done=chunk_deleted)
 
     def rename_module(self):
         selected_indices = self.module_listbox.curselection()
@@ -586,23 +807,24 @@ class StreakTrackerApp:
         if not new_name:
             return
 
-        cursor = self.conn.cursor()
         # Check if new name already exists
-        cursor.execute("SELECT id FROM modules WHERE name = ?", (new_name,))
-        if cursor.fetchone():
+        if new_name in self.module_ids:
             messagebox.showwarning("Duplicate Module", "A module with this name already exists.")
             return
 
-        try:
-            cursor.execute("UPDATE modules SET name = ? WHERE name = ?", (new_name, old_name))
-            self.conn.commit()
-            self.load_modules()
-            self.load_data()
-            self.plot_streak()
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while renaming the module: {e}")
+        self.run_write(streak_store.rename_module, old_name, new_name, on_done=lambda result: self.load_modules())
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Track daily streaks.")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="time every action in a status bar (F2 toggles it), and append a JSON lines trace to FILE")
+    args = parser.parse_args()
+    tracer = None
+    if args.trace is not None:
+        from streak_trace import Tracer
+        tracer = Tracer(args.trace or None)
     root = tk.Tk()
-    app = StreakTrackerApp(root)
+    app = StreakTrackerApp(root, tracer)
     root.mainloop()
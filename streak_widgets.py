@@ -0,0 +1,217 @@
+"""Tk widgets used by the streak tracker window."""
+from datetime import date
+
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+
+def day_text(ordinal):
+    return date.fromordinal(int(ordinal)).isoformat()
+
+
+def run_text(start, end):
+    days = int(end) - int(start) + 1
+    if days == 1:
+        return f"{day_text(start)} (1 day)"
+    return f"{day_text(start)} → {day_text(end)} ({days} days)"
+
+
+class VirtualView(ttk.Frame):
+    """Scrolling for widgets that only draw the visible ``rows`` of ``count``.
+
+    Subclasses draw rows ``top`` to ``top + rows`` in ``refresh`` and create
+    ``self.scrollbar`` with ``command=self.yview``.
+    """
+
+    def __init__(self, parent, rows):
+        super().__init__(parent)
+        self.rows = rows
+        self.count = 0
+        self.top = 0
+
+    def bind_scrolling(self, widget):
+        widget.bind("<MouseWheel>", self.on_mouse_wheel)
+        widget.bind("<Button-4>", lambda event: self.scroll_to(self.top - 1) or "break")
+        widget.bind("<Button-5>", lambda event: self.scroll_to(self.top + 1) or "break")
+
+    def yview(self, *args):
+        # Same protocol as Listbox.yview so the scrollbar can drive us directly
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.count))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.rows if args[2] == "pages" else 1)
+            self.scroll_to(self.top + step)
+
+    def on_mouse_wheel(self, event):
+        self.scroll_to(self.top - (1 if event.delta > 0 else -1) * max(abs(event.delta) // 120, 1))
+        return "break"
+
+    def scroll_to(self, top):
+        self.top = max(0, min(top, self.count - self.rows))
+        self.refresh()
+
+    def refresh(self):
+        raise NotImplementedError
+
+    def update_scrollbar(self, stop):
+        if self.count:
+            self.scrollbar.set(self.top / self.count, stop / self.count)
+        else:
+            self.scrollbar.set(0, 1)
+
+
+class VirtualList(VirtualView):
+    """A read-only list that only materializes the rows currently on screen.
+
+    The content is described by a row count and a ``row_text(index)``
+    callable, so switching to a source with 50k rows costs the same as one
+    with 5. The scrollbar is driven from the virtual position instead of
+    the listbox's own contents.
+    """
+
+    def __init__(self, parent, height=6):
+        super().__init__(parent, height)
+        self.row_text = None
+
+        self.listbox = tk.Listbox(self, selectmode=tk.MULTIPLE, height=height)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        def ignore_event(event):
+            return "break"
+        self.listbox.bind("<Button-1>", ignore_event)
+        self.listbox.bind("<B1-Motion>", ignore_event)
+        self.listbox.bind("<Key>", ignore_event)
+        self.bind_scrolling(self.listbox)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+
+    def set_source(self, count, row_text, keep_position=False):
+        self.count = count
+        self.row_text = row_text
+        self.scroll_to(self.top if keep_position else 0)
+
+    def refresh(self):
+        stop = min(self.top + self.rows, self.count)
+        self.listbox.delete(0, tk.END)
+        if stop > self.top:
+            self.listbox.insert(tk.END, *[self.row_text(i) for i in range(self.top, stop)])
+        self.update_scrollbar(stop)
+
+
+class SummaryTable(VirtualView):
+    """Sortable per-module stats with a sparkline of recent streak lengths.
+
+    Only the visible rows are drawn on a canvas, so a table of thousands of
+    modules scrolls as cheaply as one of ten. Clicking a heading sorts by
+    that column and clicking it again reverses the order; double-clicking a
+    row calls ``on_open(module_id)``.
+    """
+
+    COLUMNS = (("name", "Module", 180), ("current", "Current", 70), ("max", "Highest", 70), ("breaks", "Breaks", 70))
+    ROW_HEIGHT = 22
+    SPARK_WIDTH = 200
+
+    def __init__(self, parent, height=15, on_open=None):
+        super().__init__(parent, height)
+        self.on_open = on_open
+        self.summaries = None
+        self.order = np.empty(0, dtype=np.int64)
+        self.sort_key = "name"
+        self.descending = False
+
+        width = sum(column[2] for column in self.COLUMNS) + self.SPARK_WIDTH
+        self.header = tk.Canvas(self, width=width, height=self.ROW_HEIGHT, highlightthickness=0)
+        self.header.grid(row=0, column=0, sticky="ew")
+        self.header.bind("<Button-1>", self.on_header_click)
+        self.canvas = tk.Canvas(self, width=width, height=height * self.ROW_HEIGHT, background="white",
+                                highlightthickness=0)
+        self.canvas.grid(row=1, column=0, sticky="nsew")
+        self.canvas.bind("<Double-Button-1>", self.on_double_click)
+        self.bind_scrolling(self.canvas)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        self.draw_header()
+
+    def set_summaries(self, summaries):
+        self.summaries = summaries
+        self.count = len(summaries)
+        self.sort(keep_position=True)
+
+    def column_values(self, key):
+        return {
+            "name": self.summaries.names,
+            "current": self.summaries.current_streaks,
+            "max": self.summaries.max_streaks,
+            "breaks": self.summaries.break_counts,
+        }[key]
+
+    def sort_by(self, key):
+        if key == self.sort_key:
+            self.descending = not self.descending
+        else:
+            self.sort_key = key
+            self.descending = key != "name"  # Biggest numbers first
+        self.draw_header()
+        if self.summaries is not None:
+            self.sort()
+
+    def sort(self, keep_position=False):
+        values = self.column_values(self.sort_key)
+        if self.sort_key == "name":
+            order = np.array(sorted(range(self.count), key=lambda i: values[i].lower()), dtype=np.int64)
+        else:
+            order = np.argsort(values, kind="stable")
+        self.order = order[::-1] if self.descending else order
+        self.scroll_to(self.top if keep_position else 0)
+
+    def draw_header(self):
+        self.header.delete("all")
+        x = 4
+        for key, title, width in self.COLUMNS:
+            if key == self.sort_key:
+                title += " ▼" if self.descending else " ▲"
+            self.header.create_text(x, self.ROW_HEIGHT / 2, text=title, anchor=tk.W, font=("Arial", 10, "bold"))
+            x += width
+        self.header.create_text(x, self.ROW_HEIGHT / 2, text="Recent streak", anchor=tk.W, font=("Arial", 10, "bold"))
+
+    def on_header_click(self, event):
+        x = 0
+        for key, _, width in self.COLUMNS:
+            x += width
+            if event.x < x:
+                self.sort_by(key)
+                return
+
+    def on_double_click(self, event):
+        index = self.top + event.y // self.ROW_HEIGHT
+        if self.on_open is not None and index < self.count:
+            self.on_open(int(self.summaries.module_ids[self.order[index]]))
+
+    def refresh(self):
+        self.canvas.delete("all")
+        stop = min(self.top + self.rows, self.count)
+        for row, index in enumerate(self.order[self.top:stop]):
+            y = row * self.ROW_HEIGHT
+            if row % 2:
+                self.canvas.create_rectangle(0, y, self.canvas.winfo_reqwidth(), y + self.ROW_HEIGHT,
+                                             fill="#F4F6F7", width=0)
+            x = 4
+            for key, _, width in self.COLUMNS:
+                self.canvas.create_text(x, y + self.ROW_HEIGHT / 2, text=str(self.column_values(key)[index]),
+                                        anchor=tk.W)
+                x += width
+            self.draw_sparkline(x, y, self.summaries.recent[index])
+        self.update_scrollbar(stop)
+
+    def draw_sparkline(self, x, y, values):
+        if values.size < 2:
+            return
+        width, height = self.SPARK_WIDTH - 8, self.ROW_HEIGHT - 6
+        xs = x + np.arange(values.size) * (width / (values.size - 1))
+        ys = y + self.ROW_HEIGHT - 3 - values * (height / max(int(values.max()), 1))
+        color = "#2980B9" if values[-1] else "#AAB7B8"
+        self.canvas.create_line(*np.column_stack([xs, ys]).ravel().tolist(), fill=color)
@@ -0,0 +1,153 @@
+"""Database access on a dedicated worker thread.
+
+SQLite connections are bound to the thread that created them, so the worker
+opens its own connection and runs every queued job on it in order. Jobs are
+plain functions taking the connection as their first argument and come back
+as ``concurrent.futures.Future`` objects; ``TkDispatcher`` hands finished
+futures back to the Tk main loop.
+
+Jobs do not commit. The worker drains whatever is queued, runs each job in
+its own savepoint and commits the whole burst once, so a flurry of clicks
+costs a single commit while a failing job only rolls back its own changes.
+
+Other processes may write to the same file. A burst holding a job marked
+with ``streak_store.writes`` starts with ``BEGIN IMMEDIATE``, so it takes
+the write lock before reading anything instead of failing when a read
+transaction cannot be upgraded. When the lock stays busy past the
+connection's busy timeout, beginning and committing are retried with a
+growing back-off before the jobs fail.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+
+class DatabaseWorker:
+    def __init__(self, connect, max_batch=256, retries=4, retry_delay=0.05):
+        self.max_batch = max_batch
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.jobs = queue.Queue()
+        self.ready = Future()
+        self.thread = threading.Thread(target=self._run, args=(connect,), name="streak-db", daemon=True)
+        self.thread.start()
+
+    def _run(self, connect):
+        try:
+            conn = connect()
+        except BaseException as e:
+            self.ready.set_exception(e)
+            return
+        self.ready.set_result(None)
+        running = True
+        while running:
+            batch = [self.jobs.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = batch[:batch.index(None)]
+            self._run_batch(conn, batch)
+        conn.close()
+
+    def _run_batch(self, conn, batch):
+        finished = []
+        begin = "BEGIN IMMEDIATE" if any(getattr(func, "writes", False) for _, func, _ in batch) else "BEGIN"
+        for future, func, args in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if not conn.in_transaction:
+                    self._retry(conn.execute, begin)
+            except sqlite3.OperationalError as e:
+                finished.append((future, None, e))
+                continue
+            conn.execute("SAVEPOINT job")
+            try:
+                result = func(conn, *args)
+            except BaseException as e:
+                self._release(conn, rollback=True)
+                finished.append((future, None, e))
+            else:
+                self._release(conn, rollback=False)
+                finished.append((future, result, None))
+        try:
+            if conn.in_transaction:
+                self._retry(conn.commit)
+        except BaseException as e:
+            conn.rollback()
+            finished = [(future, None, e) for future, _, _ in finished]
+        for future, result, error in finished:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _retry(self, func, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                return func(*args)
+            except sqlite3.OperationalError as e:
+                if attempt == self.retries or "database is locked" not in str(e):
+                    raise
+            time.sleep(self.retry_delay * 2 ** attempt)
+
+    @staticmethod
+    def _release(conn, rollback):
+        try:
+            if rollback:
+                conn.execute("ROLLBACK TO job")
+            conn.execute("RELEASE job")
+        except sqlite3.OperationalError:
+            pass  # The job ended the transaction itself (e.g. a schema migration committing)
+
+    def submit(self, func, *args):
+        """Queue ``func(conn, *args)``; pending jobs can still be cancelled."""
+        future = Future()
+        self.jobs.put((future, func, args))
+        return future
+
+    # For jobs no user action waits on, such as change polls; tracing only times ``submit``
+    submit_background = submit
+
+    def call(self, func, *args):
+        """Run ``func(conn, *args)`` on the worker and wait for the result."""
+        return self.submit(func, *args).result()
+
+    def close(self):
+        self.jobs.put(None)
+        self.thread.join()
+
+
+class TkDispatcher:
+    """Runs future callbacks on the Tk thread by polling with ``after``.
+
+    Tk must only be touched from its own thread, so worker threads just
+    enqueue finished futures and the main loop drains them.
+    """
+
+    def __init__(self, root, interval=15):
+        self.root = root
+        self.interval = interval
+        self.done = queue.Queue()
+        self.root.after(self.interval, self._poll)
+
+    def then(self, future, callback):
+        """Call ``callback(future)`` on the Tk thread once ``future`` is done."""
+        future.add_done_callback(lambda f: self.done.put((callback, f)))
+        return future
+
+    def _poll(self):
+        while True:
+            try:
+                callback, future = self.done.get_nowait()
+            except queue.Empty:
+                break
+            if not future.cancelled():
+                callback(future)
+        self.root.after(self.interval, self._poll)